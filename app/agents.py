@@ -1,30 +1,48 @@
 import chromadb
+import httpx
+import re
+import threading
+import time
+from chromadb.api import ClientAPI
+from functools import lru_cache
 from typing import List
 from langchain_core.documents import Document
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_ollama import ChatOllama
+from langchain_core.runnables import RunnableLambda
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
 from langmem.short_term import SummarizationNode
+from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage, SystemMessage
 from langchain_core.messages.utils import count_tokens_approximately
-from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.messages import AnyMessage
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.catalog import (
+    DocumentCache,
+    get_alias_target,
+    get_lexical_index,
+    get_vocabulary,
+    title_words,
+)
+from app.filters import extract_filters
+from app.history import advance_window, count_tokens_cached, with_token_count
+from app import router
+from app.core.metrics import metrics
+from app.resilience import ResilientEmbeddings, guarded_call
 from langgraph.graph import MessagesState
 from langmem.short_term import RunningSummary
 
 logger = get_logger(__name__)
 
-CHAT = ChatOllama(
-    model=settings.OLLAMA_MODEL,
-    temperature=0,
-    base_url=settings.OLLAMA_BASE_URL,
-)
+# Smallest configured model, used for summarization
+CHAT = router.get_chat(router.get_tiers()[0])
 
-EMB = OllamaEmbeddings(
-    model=settings.EMBEDDING_MODEL_NAME,
-    base_url=settings.OLLAMA_BASE_URL,
+EMB = ResilientEmbeddings(
+    OllamaEmbeddings(
+        model=settings.EMBEDDING_MODEL_NAME,
+        base_url=settings.OLLAMA_BASE_URL,
+        client_kwargs={"timeout": settings.EMBEDDING_TIMEOUT_SECONDS},
+    )
 )
 
 
@@ -32,49 +50,374 @@ class State(MessagesState):
     """Multi-agent conversation state tracking messages and context."""
 
     context: dict[str, RunningSummary] | None  # Conversation summaries by context key
+    document_ids: List[str] | None  # Ids of the documents retrieved on the last turn
+    document_scores: List[float] | None  # Search distances of those documents
+    history_start: int | None  # Index of the first message not covered by the summary
+    history_counted: int | None  # Number of messages accounted in history_tokens
+    history_tokens: int | None  # Token count of the accounted messages from history_start on
+
+    # Transient fields, cleared by compact_state before the turn is checkpointed
+    history_window: List[AnyMessage] | None  # Messages from history_start on
     summarized_messages: List[AnyMessage] | None  # Condensed message history
     documents: List[Document] | None  # Retrieved documents from vector store
+    filters: dict | None  # Metadata filters extracted from the latest question
     enhanced_query: str | None  # Query enhanced with conversation context
     generation: str | None  # Final generated response
 
 
+TRANSIENT_KEYS = (
+    "history_window",
+    "summarized_messages",
+    "documents",
+    "filters",
+    "enhanced_query",
+    "generation",
+)
+
+
+# Longest summary generated, and room for langmem's instructions around the messages
+_SUMMARY_TOKENS = 256
+_SUMMARY_PROMPT_TOKENS = 256
+
+
+def _summary_input_tokens(num_ctx: int | None) -> int:
+    """Return the history tokens one summarization call can take within ``num_ctx``.
+
+    The messages share the context with the instructions, the previous summary and
+    the summary being generated.
+    """
+    if num_ctx is None:
+        return 4096
+    return max(_SUMMARY_TOKENS, num_ctx - 2 * _SUMMARY_TOKENS - _SUMMARY_PROMPT_TOKENS)
+
+
+_SUMMARY_CONTEXT = router.get_tiers()[0].num_ctx
+_SUMMARY_INPUT_TOKENS = _summary_input_tokens(_SUMMARY_CONTEXT)
+# The window is the summarizer input, so it must fit the summarization tier as well
+_HISTORY_WINDOW_TOKENS = (
+    settings.HISTORY_WINDOW_TOKENS
+    if _SUMMARY_CONTEXT is None
+    else min(settings.HISTORY_WINDOW_TOKENS, _SUMMARY_INPUT_TOKENS)
+)
+
+_SUMMARY_CHAT = CHAT.bind(num_predict=_SUMMARY_TOKENS)
+
+# Summarizes the history window only, with the token counts cached on its messages
 summarizer_node = SummarizationNode(
-    model=CHAT.bind(num_predict=256),
-    max_tokens=4096,
-    max_summary_tokens=1024,
-    token_counter=count_tokens_approximately,
+    model=RunnableLambda(lambda messages: router.invoke_chat(_SUMMARY_CHAT, messages)),
+    max_tokens=_SUMMARY_INPUT_TOKENS,
+    max_summary_tokens=_SUMMARY_TOKENS,
+    token_counter=count_tokens_cached,
+    input_messages_key="history_window",
 )
 
 
-def _get_vectorstore() -> Chroma:
-    """Initialize ChromaDB vector store client.
+def account_history(state: State) -> dict:
+    """Count the tokens of new messages and select the history window to summarize.
+
+    Each message is tokenized once, when it first appears, and its count is cached
+    in its ``response_metadata``. The window of messages not yet covered by the
+    running summary, and its token total, are carried from turn to turn and
+    updated incrementally. Messages that leave the window are removed from the
+    checkpointed history, since the running summary stands in for them, so the
+    work per turn does not grow with the length of the conversation.
+
+    Args:
+        state (State): Conversation state at the start of the turn.
 
     Returns:
-        Chroma: Configured ChromaDB vector store instance.
+        dict: Removals of the messages left behind, counted new messages, the window
+        bounds and the window messages.
     """
+    messages: List[AnyMessage] = state.get("messages") or []
+    start = state.get("history_start") or 0
+    accounted = state.get("history_counted") or 0
+    total = state.get("history_tokens") or 0
+
+    counted = [with_token_count(m) for m in messages[accounted:]]
+    total += count_tokens_cached(counted)
+    window = [*messages[start:accounted], *counted]
+
+    context = state.get("context") or {}
+    running_summary = context.get("running_summary")
+    last_summarized_id = running_summary.last_summarized_message_id if running_summary else None
+    dropped, total = advance_window(window, total, last_summarized_id, _HISTORY_WINDOW_TOKENS)
+    logger.debug("History window: %d messages, %d tokens", len(window) - dropped, total)
+
+    # Everything before the window leaves the state; the window starts the history
+    removed = start + dropped
+    update: dict = {
+        "messages": [
+            *(RemoveMessage(id=m.id) for m in messages[:removed] if m.id),
+            *counted[max(0, removed - accounted) :],
+        ],
+        "history_start": 0,
+        "history_counted": len(messages) - removed,
+        "history_tokens": total,
+        "history_window": window[dropped:],
+    }
+    if running_summary and running_summary.summarized_message_ids:
+        # The summarized messages are gone, so their ids no longer need checking
+        update["context"] = {
+            **context,
+            "running_summary": RunningSummary(
+                summary=running_summary.summary,
+                summarized_message_ids=set(),
+                last_summarized_message_id=last_summarized_id,
+            ),
+        }
+    return update
+
+
+def summarize_history(state: State) -> dict:
+    """Summarize the history window, keeping it as is if the chat model fails.
+
+    The window is already capped at ``HISTORY_WINDOW_TOKENS`` by ``account_history``,
+    so a turn whose summarization times out or is rejected by the open breaker is
+    still answered, from the recent messages only.
+
+    Args:
+        state (State): Conversation state with the history window.
+
+    Returns:
+        dict: Summarizer update, or the unsummarized window.
+    """
+    try:
+        return summarizer_node.invoke(state)
+    except Exception as e:
+        logger.warning("Summarization unavailable, keeping the history window: %s", e)
+        metrics.increment("summarizer.skipped")
+        return {"summarized_messages": state.get("history_window") or []}
+
+
+@lru_cache(maxsize=1)
+def _get_client() -> ClientAPI:
+    """Create the ChromaDB client, once per process."""
     client = chromadb.HttpClient(
         host=settings.CHROMA_HOST,
         port=settings.CHROMA_PORT,
     )
+    # The HTTP session waits forever and chromadb has no setting for it; bound it so that
+    # calls abandoned by guarded_call give their worker thread back
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if isinstance(session, httpx.Client):
+        session.timeout = httpx.Timeout(settings.SEARCH_TIMEOUT_SECONDS)
+    else:
+        logger.warning("Could not set a ChromaDB HTTP timeout; relying on call deadlines only")
+    return client
+
+
+@lru_cache(maxsize=4)
+def _get_collection_vectorstore(collection_name: str) -> Chroma:
+    """Create the vector store for one catalog collection version."""
     return Chroma(
-        client=client,
-        collection_name="products",
+        client=_get_client(),
+        collection_name=collection_name,
         embedding_function=EMB,
     )
 
 
-def retriever_agent(state: State) -> State:
+_active_collection: dict = {"name": None, "checked_at": 0.0}
+_active_collection_lock = threading.Lock()
+
+
+def _resolve_active_collection() -> str:
+    """Return the collection the catalog alias currently points to.
+
+    The alias is re-read at most every ``COLLECTION_ALIAS_TTL_SECONDS``, so a
+    reindex switch is picked up without a restart. Catalogs ingested before
+    versioning have no alias and keep using ``COLLECTION_NAME`` directly.
+
+    Returns:
+        str: Name of the collection to query.
+    """
+    alias = settings.COLLECTION_NAME
+    now = time.monotonic()
+    with _active_collection_lock:
+        current = _active_collection["name"]
+        age = now - _active_collection["checked_at"]
+        if current and age < settings.COLLECTION_ALIAS_TTL_SECONDS:
+            return current
+
+    try:
+        target = get_alias_target(_get_client(), alias) or alias
+    except Exception as e:
+        logger.warning("Could not read catalog alias, keeping %s: %s", current, e)
+        target = current or alias
+
+    with _active_collection_lock:
+        if target != _active_collection["name"]:
+            if _active_collection["name"] is not None:
+                logger.info("Catalog alias switched to collection '%s'", target)
+                _document_cache.clear()
+            _active_collection["name"] = target
+        _active_collection["checked_at"] = now
+    return target
+
+
+def _get_vectorstore() -> Chroma:
+    """Initialize ChromaDB vector store client.
+
+    Clients are created once per process and reused across requests; the
+    collection follows the catalog alias.
+
+    Returns:
+        Chroma: Configured ChromaDB vector store instance.
+    """
+    return _get_collection_vectorstore(_resolve_active_collection())
+
+
+def _open_vectorstore() -> Chroma:
+    """Get the vector store under the "chroma" breaker and deadline.
+
+    Connecting, reading the alias and opening the collection all call ChromaDB.
+    """
+    return guarded_call(
+        "chroma",
+        _get_vectorstore,
+        timeout=settings.SEARCH_TIMEOUT_SECONDS,
+        retries=settings.RETRY_ATTEMPTS,
+    )
+
+
+_document_cache = DocumentCache()
+
+
+def _resolve_documents(ids: List[str]) -> List[Document]:
+    """Resolve document ids to documents, from the local cache or the vector store.
+
+    Args:
+        ids: Document ids in the desired order
+
+    Returns:
+        List[Document]: Documents found for the ids
+    """
+
+    def load(missing: List[str]) -> List[Document]:
+        metrics.upstream_call("vector_get")
+        try:
+            return guarded_call(
+                "chroma",
+                _open_vectorstore().get_by_ids,
+                missing,
+                timeout=settings.SEARCH_TIMEOUT_SECONDS,
+                retries=settings.RETRY_ATTEMPTS,
+            )
+        except Exception as e:
+            logger.warning("Vector store unavailable, loading documents from the catalog: %s", e)
+            catalog = get_lexical_index().documents
+            return [catalog[i] for i in missing if i in catalog]
+
+    return _document_cache.get_many(ids, load)
+
+
+def warm_up() -> None:
+    """Load per-process resources before the worker starts serving requests.
+
+    Loads the catalog vocabulary, opens the ChromaDB client and has Ollama load the
+    embedding model, so the first request handled by each worker does not pay for
+    it. Failures are only logged; the request path reports them if they persist.
+    """
+    logger.info("Warming up worker resources")
+    get_vocabulary()
+    get_lexical_index()
+    try:
+        _open_vectorstore()
+        EMB.embed_query("warm up")
+    except Exception as e:
+        logger.warning("Warm-up incomplete: %s", e)
+
+
+_ELLIPTICAL_PATTERNS = (
+    "and what",
+    "what about",
+    "how about",
+    "and how",
+    "and when",
+    "and where",
+    "what's the",
+    "what is the",
+    "how's the",
+    "how is the",
+    "when's the",
+    "when is the",
+    "where's the",
+    "where is the",
+    "and the",
+    "the price",
+    "the warranty",
+    "the shipping",
+    "the stock",
+    "the rating",
+    "the reviews",
+    "the brand",
+    "the category",
+)
+
+
+def _is_elliptical(question: str) -> bool:
+    """Check whether a question is an elliptical follow-up such as "and the warranty?".
+
+    Comparisons and superlatives ("what is the cheapest laptop?") ask about the
+    whole catalog, so they are never elliptical.
+    """
+    question = question.lower()
+    return question.startswith(_ELLIPTICAL_PATTERNS) and not router.is_comparison(question)
+
+
+def _introduces_new_entity(question: str, docs: List[Document]) -> bool:
+    """Check whether a follow-up refers to something other than the given documents.
+
+    A question introduces a new entity when it carries metadata constraints (a
+    brand, category, price or rating) or names a catalog product word that none of
+    the documents' titles contain.
+
+    Args:
+        question: Current user question
+        docs: Documents retrieved on the previous turn
+
+    Returns:
+        bool: True if the documents cannot be assumed to answer the question
+    """
+    if extract_filters(question):
+        return True
+
+    catalog_words = get_vocabulary().title_words
+    known_words: set[str] = set()
+    for doc in docs:
+        known_words |= title_words(str(doc.metadata.get("title", "")) or doc.page_content)
+
+    question_words = set(re.findall(r"[a-z0-9]+", question.lower()))
+    return bool((question_words & catalog_words) - known_words)
+
+
+def _rerank(docs: List[Document], text: str) -> List[Document]:
+    """Order documents by how many of their title words appear in ``text``."""
+    words = set(re.findall(r"[a-z0-9]+", text.lower()))
+    return sorted(
+        docs,
+        key=lambda d: len(title_words(str(d.metadata.get("title", ""))) & words),
+        reverse=True,
+    )
+
+
+def retriever_agent(state: State) -> dict:
     """Retrieve relevant documents using enhanced query from conversation context.
 
     Combines the latest user message with summarized conversation history to create
     an enhanced search query, then retrieves the most relevant documents from the
-    vector store.
+    vector store. Metadata constraints found in the latest message (category, brand,
+    price, rating, availability) are pushed down to the search as a ``where`` clause.
+
+    Elliptical follow-ups that do not introduce a new product reuse the previous
+    turn's documents instead of searching again.
 
     Args:
         state (State): Current conversation state containing messages and summaries.
 
     Returns:
-        State: Updated state with enhanced_query and retrieved documents.
+        dict: State update with enhanced_query, filters, retrieved documents and
+        their ids and scores.
     """
     logger.info("Starting document retrieval")
 
@@ -97,15 +440,82 @@ def retriever_agent(state: State) -> State:
 
     logger.debug("Enhanced query: %s", enhanced_query)
 
-    vectorstore = _get_vectorstore()
-    docs: List[Document] = vectorstore.similarity_search(enhanced_query, k=settings.RETRIEVAL_TOP_K)
-
+    # Elliptical follow-ups about the same product are answered from the documents
+    # retrieved on the previous turn, skipping the embedding and vector search.
+    previous_ids: List[str] = state.get("document_ids") or []
+    if previous_ids and _is_elliptical(latest_user):
+        previous_docs = _resolve_documents(previous_ids)
+        if previous_docs and not _introduces_new_entity(latest_user, previous_docs):
+            recent = " ".join(getattr(m, "content", "") for m in raw_messages[-3:])
+            scores = dict(zip(previous_ids, state.get("document_scores") or []))
+            docs = _rerank(previous_docs, recent)
+            metrics.increment("retrieval.reused")
+            logger.info("Reusing %d documents from the previous turn", len(docs))
+            return {
+                "enhanced_query": enhanced_query,
+                "documents": docs,
+                "document_ids": [d.id for d in docs],
+                "document_scores": [scores.get(d.id or "", 0.0) for d in docs],
+                "filters": None,
+            }
+
+    where = extract_filters(latest_user)
+    logger.debug("Metadata filters: %s", where)
+
+    try:
+        results = _vector_search(enhanced_query, where)
+    except Exception as e:
+        # Embedding or vector search is down or too slow: degrade to keyword search
+        logger.warning("Vector search unavailable, falling back to lexical search: %s", e)
+        metrics.increment("retrieval.lexical_fallback")
+        results = get_lexical_index().search(enhanced_query, settings.RETRIEVAL_TOP_K)
+
+    docs = [doc for doc, _ in results]
+    _document_cache.put(docs)
     logger.info("Retrieved %d documents from vector store", len(docs))
+    metrics.increment("retrieval.searched")
 
-    state["enhanced_query"] = enhanced_query
-    state["documents"] = docs
+    # Only changed keys are returned, so the messages reducer does not merge the history again
+    return {
+        "enhanced_query": enhanced_query,
+        "documents": docs,
+        "document_ids": [doc.id for doc, _ in results if doc.id],
+        "document_scores": [float(score) for doc, score in results if doc.id],
+        "filters": where,
+    }
 
-    return state
+
+def _vector_search(query: str, where: dict | None) -> List[tuple[Document, float]]:
+    """Embed the query once and search the catalog, retrying without filters if needed.
+
+    Raises:
+        CircuitOpenError: If Ollama embeddings or ChromaDB are failing.
+        DeadlineExceeded: If a call did not finish in time.
+    """
+    vectorstore = _open_vectorstore()
+    metrics.upstream_call("embedding")
+    embedding = EMB.embed_query(query)
+
+    def search(where_clause: dict | None) -> List[tuple[Document, float]]:
+        metrics.upstream_call("vector_search")
+        return guarded_call(
+            "chroma",
+            vectorstore.similarity_search_by_vector_with_relevance_scores,
+            embedding,
+            k=settings.RETRIEVAL_TOP_K,
+            filter=where_clause,
+            timeout=settings.SEARCH_TIMEOUT_SECONDS,
+            retries=settings.RETRY_ATTEMPTS,
+        )
+
+    results: List[tuple[Document, float]] = []
+    if where:
+        results = search(where)
+        if not results:
+            logger.info("No documents matched filters %s, retrying without them", where)
+    if not results:
+        results = search(None)
+    return results
 
 
 def _has_clear_product_context(summarized: List[AnyMessage], question: str) -> bool:
@@ -118,37 +528,7 @@ def _has_clear_product_context(summarized: List[AnyMessage], question: str) -> b
     Returns:
         bool: True if there's a clear product context, False otherwise
     """
-    elliptical_patterns = [
-        "and what",
-        "what about",
-        "how about",
-        "and how",
-        "and when",
-        "and where",
-        "what's the",
-        "what is the",
-        "how's the",
-        "how is the",
-        "when's the",
-        "when is the",
-        "where's the",
-        "where is the",
-        "and the",
-        "the price",
-        "the warranty",
-        "the shipping",
-        "the stock",
-        "the rating",
-        "the reviews",
-        "the brand",
-        "the category",
-    ]
-
-    is_elliptical = any(
-        question.lower().startswith(pattern.lower()) for pattern in elliptical_patterns
-    )
-
-    if not is_elliptical:
+    if not _is_elliptical(question):
         return True
 
     conversation_text = " ".join(
@@ -188,17 +568,51 @@ def _has_clear_product_context(summarized: List[AnyMessage], question: str) -> b
     return has_product_context
 
 
-def responder_agent(state: State) -> State:
+def _format_document(index: int, doc: Document) -> str:
+    """Render a document for the prompt, preferring its precomputed fact sheet.
+
+    Documents ingested before fact sheets existed fall back to their raw metadata.
+    """
+    facts = doc.metadata.get("fact_sheet")
+    if facts:
+        return f"[{index}] {doc.page_content}\nFACTS: {facts}"
+    return f"[{index}] {doc.page_content}\nMETA: {doc.metadata}"
+
+
+def _degraded_answer(
+    question: str, docs: List[Document], has_context: bool, first_turn: bool
+) -> str:
+    """Answer without the chat model: a cached answer, or the retrieved fact sheets.
+
+    Cached answers only exist for first-turn questions, whose answer does not depend
+    on a conversation.
+    """
+    cached = router.cached_answer(question, [d.id for d in docs if d.id]) if first_turn else None
+    if cached:
+        metrics.increment("responder.cached_answer")
+        return cached
+
+    metrics.increment("responder.degraded")
+    facts = [d.metadata.get("fact_sheet") for d in docs if d.metadata.get("fact_sheet")]
+    if not has_context or not facts:
+        return "Sorry, I can't answer right now. Please try again in a moment."
+    return "I can't give a full answer right now, but here is what I found:\n" + "\n".join(
+        f"- {fact}" for fact in facts
+    )
+
+
+def responder_agent(state: State) -> dict:
     """Generate final response using retrieved documents and conversation context.
 
     Creates a contextual response by combining retrieved documents with the
-    conversation history, then generates an answer using the configured LLM.
+    conversation history, then generates an answer with the smallest model tier
+    adequate for the question's complexity and able to hold the prompt.
 
     Args:
         state (State): Current conversation state with documents and messages.
 
     Returns:
-        State: Updated state with generated response and updated message history.
+        dict: State update with the generated response and the new answer message.
     """
     logger.info("Generating response")
     docs: List[Document] = state.get("documents") or []
@@ -216,9 +630,7 @@ def responder_agent(state: State) -> State:
 
     has_context = _has_clear_product_context(summarized, question)
 
-    context_str = "\n\n".join(
-        f"[{i+1}] {d.page_content}\nMETA: {d.metadata}" for i, d in enumerate(docs)
-    )
+    context_str = "\n\n".join(_format_document(i + 1, d) for i, d in enumerate(docs))
     logger.debug("Context length: %d characters", len(context_str))
     logger.debug("Has clear product context: %s", has_context)
 
@@ -249,19 +661,60 @@ def responder_agent(state: State) -> State:
         ]
     )
 
-    chain = prompt | CHAT
-
-    response = chain.invoke(
-        {
-            "summarized_messages": summarized,
-            "context": context_str,
-            "question": question,
-        }
+    complexity = router.estimate_complexity(question, docs)
+    # History counts are cached; only the instructions, context and question are counted
+    fixed_tokens = count_tokens_approximately(
+        [SystemMessage(content=system_prompt + context_str), HumanMessage(content=question)]
     )
-
-    answer_text = getattr(response, "content", str(response))
+    history_tokens = count_tokens_cached(summarized)
+    tier_index = router.select_tier(complexity, fixed_tokens + history_tokens)
+    budget = router.prompt_budget(router.get_tiers()[tier_index])
+    if budget is not None and fixed_tokens + history_tokens > budget:
+        # Drop the oldest history rather than let Ollama cut the instructions and context
+        dropped, _ = advance_window(summarized, history_tokens, None, max(0, budget - fixed_tokens))
+        summarized = summarized[dropped:]
+        logger.warning("Prompt too long for every tier, dropped %d history messages", dropped)
+    logger.debug("Question complexity %d routed to tier %d", complexity, tier_index)
+
+    # Only answers without a conversation behind them can be shared across users
+    running_summary = (state.get("context") or {}).get("running_summary")
+    first_turn = len(raw_messages) <= 1 and running_summary is None
+    document_ids = [d.id for d in docs if d.id] if first_turn else None
+    try:
+        answer_text = router.generate(
+            prompt,
+            {
+                "summarized_messages": summarized,
+                "context": context_str,
+                "question": question,
+            },
+            tier_index,
+            # Clarification requests are expected answers, not a reason to escalate
+            escalate=has_context,
+            document_ids=document_ids,
+        )
+    except Exception as e:
+        logger.warning("Generation unavailable, answering in degraded mode: %s", e)
+        answer_text = _degraded_answer(question, docs, has_context, first_turn)
     logger.info("Generated response (%d chars): %s...", len(answer_text), answer_text[:120])
 
-    state["messages"] = list(raw_messages) + [AIMessage(content=answer_text)]
-    state["generation"] = answer_text
-    return state
+    # Only the new answer is returned; the messages reducer appends it to the history
+    return {
+        "messages": [with_token_count(AIMessage(content=answer_text))],
+        "generation": answer_text,
+    }
+
+
+def compact_state(state: State) -> dict:
+    """Clear per-turn fields so checkpoints only keep what the next turn needs.
+
+    Messages, the running summary and the ids and scores of the retrieved documents
+    are kept; documents are resolved again from their ids when needed.
+
+    Args:
+        state (State): Conversation state at the end of the turn.
+
+    Returns:
+        dict: State update resetting every transient field.
+    """
+    return {key: None for key in TRANSIENT_KEYS}
@@ -0,0 +1,379 @@
+import ast
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, List
+import pandas as pd
+from chromadb.api import ClientAPI
+from chromadb.errors import NotFoundError
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Words too generic to identify a product on their own
+_GENERIC_WORDS = {"the", "and", "with", "for", "new", "man", "men"}
+
+
+def title_words(title: str) -> set[str]:
+    """Split a product title into lowercase words that may identify the product."""
+    return {w for w in re.findall(r"[a-z0-9]+", title.lower()) if len(w) > 2} - _GENERIC_WORDS
+
+
+@dataclass(frozen=True)
+class CatalogVocabulary:
+    """Known values of the filterable catalog columns.
+
+    ``title_words`` holds the identifying words of every product title, computed
+    once when the vocabulary is built.
+    """
+
+    categories: tuple[str, ...] = ()
+    brands: tuple[str, ...] = ()
+    titles: tuple[str, ...] = ()
+    title_words: frozenset[str] = field(init=False)
+
+    def __post_init__(self):
+        words = frozenset(w for title in self.titles for w in title_words(title))
+        object.__setattr__(self, "title_words", words)
+
+
+@lru_cache(maxsize=1)
+def get_vocabulary() -> CatalogVocabulary:
+    """Load the distinct categories, brands and product titles from the product CSV.
+
+    The result is cached for the lifetime of the process, since the CSV is the
+    same file the vector store was ingested from.
+
+    Returns:
+        CatalogVocabulary: Known catalog values, empty if the CSV cannot be read.
+    """
+    try:
+        df = pd.read_csv(settings.PRODUCT_CSV_PATH, usecols=["title", "category", "brand"])
+    except Exception as e:
+        logger.warning(
+            "Could not load catalog vocabulary from %s: %s", settings.PRODUCT_CSV_PATH, e
+        )
+        return CatalogVocabulary()
+
+    categories = tuple(sorted(df["category"].dropna().astype(str).str.strip().unique()))
+    brands = tuple(sorted(df["brand"].dropna().astype(str).str.strip().unique()))
+    titles = tuple(sorted(df["title"].dropna().astype(str).str.strip().unique()))
+
+    logger.info("Loaded catalog vocabulary: %d categories, %d brands", len(categories), len(brands))
+    return CatalogVocabulary(
+        categories=tuple(c for c in categories if c),
+        brands=tuple(b for b in brands if b),
+        titles=tuple(t for t in titles if t),
+    )
+
+
+def alias_collection_name(alias: str) -> str:
+    """Name of the collection whose metadata holds the alias pointer."""
+    return f"{alias}-alias"
+
+
+def new_version_name(alias: str) -> str:
+    """Name a new versioned collection for the alias, ordered by creation time."""
+    return f"{alias}-v{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+
+
+def list_versions(client: ClientAPI, alias: str) -> list[str]:
+    """List the versioned collections of an alias, oldest first."""
+    prefix = f"{alias}-v"
+    return sorted(c.name for c in client.list_collections() if c.name.startswith(prefix))
+
+
+def get_alias_target(client: ClientAPI, alias: str) -> str | None:
+    """Return the collection an alias points to.
+
+    Args:
+        client (ClientAPI): ChromaDB client.
+        alias (str): Alias name, ``COLLECTION_NAME`` for the product catalog.
+
+    Returns:
+        str | None: Target collection name, or None if the alias was never set.
+    """
+    try:
+        collection = client.get_collection(alias_collection_name(alias), embedding_function=None)
+    except (NotFoundError, ValueError):
+        return None
+    return (collection.metadata or {}).get("target")
+
+
+def set_alias_target(client: ClientAPI, alias: str, target: str) -> None:
+    """Atomically point an alias to another collection.
+
+    Args:
+        client (ClientAPI): ChromaDB client.
+        alias (str): Alias name.
+        target (str): Collection the alias should resolve to.
+    """
+    collection = client.get_or_create_collection(
+        alias_collection_name(alias), embedding_function=None
+    )
+    collection.modify(metadata={"target": target})
+
+
+class DocumentCache:
+    """Bounded, thread-safe LRU cache of catalog documents keyed by document id.
+
+    Conversation state only keeps document ids; this cache resolves them back to
+    documents, loading misses from the shared catalog store.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._maxsize = maxsize
+        self._docs: OrderedDict[str, Document] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, docs: List[Document]) -> None:
+        """Add documents that carry an id to the cache."""
+        with self._lock:
+            for doc in docs:
+                if doc.id:
+                    self._docs[doc.id] = doc
+                    self._docs.move_to_end(doc.id)
+            while len(self._docs) > self._maxsize:
+                self._docs.popitem(last=False)
+
+    def get_many(
+        self, ids: List[str], loader: Callable[[List[str]], List[Document]]
+    ) -> List[Document]:
+        """Resolve ids to documents in the given order, loading the misses.
+
+        Args:
+            ids (List[str]): Document ids to resolve.
+            loader (Callable[[List[str]], List[Document]]): Fetches documents by id
+                from the catalog store.
+
+        Returns:
+            List[Document]: Resolved documents; ids unknown to the store are skipped.
+        """
+        with self._lock:
+            found = {}
+            for i in ids:
+                if i in self._docs:
+                    self._docs.move_to_end(i)
+                    found[i] = self._docs[i]
+
+        missing = [i for i in ids if i not in found]
+        if missing:
+            loaded = {doc.id: doc for doc in loader(missing) if doc.id}
+            self.put(list(loaded.values()))
+            found.update(loaded)
+
+        return [found[i] for i in ids if i in found]
+
+    def clear(self) -> None:
+        """Remove all cached documents."""
+        with self._lock:
+            self._docs.clear()
+
+
+def _to_number(value: Any, cast: type = float) -> float | int | None:
+    """Convert a CSV cell to a number, or None when it is missing or malformed."""
+    try:
+        if value is None or pd.isna(value):
+            return None
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(number, 2) if cast is float else cast(number)
+
+
+def _parse_reviews(raw: Any) -> list[dict[str, Any]]:
+    """Parse the ``reviews`` column, a Python-literal list of review dicts."""
+    if not isinstance(raw, str) or not raw.strip():
+        return []
+    try:
+        reviews = ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        return []
+    return [r for r in reviews if isinstance(r, dict)] if isinstance(reviews, list) else []
+
+
+def build_fact_sheet(row: dict[str, Any], max_comments: int = 3) -> dict[str, Any]:
+    """Precompute compact, pre-digested facts for one product row.
+
+    Reviews are aggregated into a count, mean rating, rating histogram and the
+    most frequent comments; numeric columns are normalized; and everything is
+    rendered into a one-line ``fact_sheet`` the responder can use as is.
+
+    Args:
+        row (dict[str, Any]): Product row from the catalog CSV.
+        max_comments (int): Number of representative review comments to keep.
+            Defaults to 3.
+
+    Returns:
+        dict[str, Any]: Flat metadata fields; values are str, int or float so they
+        can be stored as vector store metadata.
+    """
+    price = _to_number(row.get("price"))
+    discount = _to_number(row.get("discountPercentage"))
+    rating = _to_number(row.get("rating"))
+    stock = _to_number(row.get("stock"), int)
+    min_order = _to_number(row.get("minimumOrderQuantity"), int)
+    weight = _to_number(row.get("weight"))
+
+    reviews = _parse_reviews(row.get("reviews"))
+    review_ratings = [r["rating"] for r in reviews if isinstance(r.get("rating"), (int, float))]
+    histogram = Counter(int(r) for r in review_ratings)
+    comments = Counter(str(r["comment"]).strip() for r in reviews if r.get("comment"))
+    top_comments = [c for c, _ in comments.most_common(max_comments)]
+    review_mean = round(sum(review_ratings) / len(review_ratings), 2) if review_ratings else None
+
+    facts: dict[str, Any] = {
+        "review_count": len(reviews),
+        "review_histogram": " ".join(f"{star}:{histogram.get(star, 0)}" for star in range(1, 6)),
+        "review_comments": " | ".join(top_comments),
+    }
+    if review_mean is not None:
+        facts["review_mean"] = review_mean
+    for key, value in (
+        ("price", price),
+        ("discountPercentage", discount),
+        ("rating", rating),
+        ("stock", stock),
+        ("minimumOrderQuantity", min_order),
+        ("weight", weight),
+    ):
+        if value is not None:
+            facts[key] = value
+
+    parts = []
+    if price is not None:
+        parts.append(f"Price ${price:.2f}" + (f" ({discount:g}% off)" if discount else ""))
+    if rating is not None:
+        parts.append(f"Rated {rating:g}/5")
+    availability = row.get("availabilityStatus")
+    if isinstance(availability, str) and availability:
+        parts.append(availability + (f" ({stock} units)" if stock is not None else ""))
+    if min_order:
+        parts.append(f"Minimum order {min_order}")
+    for key in ("warrantyInformation", "shippingInformation", "returnPolicy"):
+        value = row.get(key)
+        if isinstance(value, str) and value:
+            parts.append(value)
+    if reviews:
+        review_text = f"{len(reviews)} reviews"
+        if review_mean is not None:
+            review_text += f" averaging {review_mean:g}/5 ({facts['review_histogram']})"
+        if top_comments:
+            review_text += ": " + "; ".join(f'"{c}"' for c in top_comments)
+        parts.append(review_text)
+    facts["fact_sheet"] = ". ".join(parts)
+
+    return facts
+
+
+def build_documents(df: pd.DataFrame) -> List[Document]:
+    """Turn catalog rows into the documents stored in the vector store.
+
+    Metadata values are cleaned so that the vector store accepts them, and raw
+    reviews are replaced by the aggregates of ``build_fact_sheet``.
+
+    Args:
+        df (pd.DataFrame): Catalog rows read from the product CSV.
+
+    Returns:
+        List[Document]: One document per product, with id ``product_<id>``.
+    """
+    documents = []
+    for _, row in df.iterrows():
+        page_content = (
+            f"Product Name: {row.get('title', 'N/A')}\n"
+            f"Description: {row.get('description', 'N/A')}\n"
+            f"Category: {row.get('category', 'N/A')}\n"
+            f"Brand: {row.get('brand', 'N/A')}"
+        )
+
+        metadata = row.to_dict()
+        # Raw reviews are replaced by the precomputed aggregates of the fact sheet
+        metadata.pop("reviews", None)
+
+        cleaned_metadata: dict[str, Any] = {}
+        for key, value in metadata.items():
+            if pd.isna(value) or value == "":
+                cleaned_metadata[key] = "N/A"
+            elif isinstance(value, (int, float)):
+                cleaned_metadata[key] = value
+            else:
+                str_value = str(value)
+                if len(str_value) > 1000:
+                    str_value = str_value[:1000] + "..."
+                cleaned_metadata[key] = str_value
+        cleaned_metadata.update(build_fact_sheet(row.to_dict()))
+
+        documents.append(
+            Document(
+                id=f"product_{row['id']}", page_content=page_content, metadata=cleaned_metadata
+            )
+        )
+    return documents
+
+
+def _tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class LexicalIndex:
+    """Keyword index over the catalog documents, used when vector search is unavailable.
+
+    Documents are scored by the inverse document frequency of the query terms
+    they contain; terms of the product title count double.
+    """
+
+    def __init__(self, documents: List[Document]):
+        self.documents = {doc.id: doc for doc in documents}
+        self._terms: list[tuple[Document, Counter]] = []
+        document_frequency: Counter = Counter()
+        for doc in documents:
+            terms = Counter(set(_tokenize(doc.page_content)))
+            terms.update(set(_tokenize(str(doc.metadata.get("title", "")))))
+            self._terms.append((doc, terms))
+            document_frequency.update(terms.keys())
+        self._idf = {
+            term: math.log(1 + len(documents) / count) for term, count in document_frequency.items()
+        }
+
+    def search(self, query: str, k: int) -> List[tuple[Document, float]]:
+        """Return the ``k`` best matching documents with a distance-like score.
+
+        Args:
+            query (str): Free-text query.
+            k (int): Number of documents to return.
+
+        Returns:
+            List[tuple[Document, float]]: Matches, best first; lower scores are
+            better, as with vector search distances.
+        """
+        query_terms = set(_tokenize(query))
+        scored = []
+        for doc, terms in self._terms:
+            score = sum(self._idf[t] * terms[t] for t in query_terms if t in terms)
+            if score > 0:
+                scored.append((score, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(doc, 1.0 / (1.0 + score)) for score, doc in scored[:k]]
+
+
+@lru_cache(maxsize=1)
+def get_lexical_index() -> LexicalIndex:
+    """Build the lexical index from the product CSV, once per process.
+
+    Returns:
+        LexicalIndex: Index over the catalog, empty if the CSV cannot be read.
+    """
+    try:
+        df = pd.read_csv(settings.PRODUCT_CSV_PATH)
+    except Exception as e:
+        logger.warning("Could not load catalog from %s: %s", settings.PRODUCT_CSV_PATH, e)
+        return LexicalIndex([])
+    return LexicalIndex(build_documents(df))
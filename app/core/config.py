@@ -1,6 +1,18 @@
+from typing import Literal
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class ModelTier(BaseModel):
+    """Generation model tier, ordered from smallest to largest in ``MODEL_TIERS``."""
+
+    name: str
+    model: str
+    max_complexity: int = 0  # Highest question complexity score routed to this tier
+    num_predict: int | None = None  # Maximum tokens to generate
+    num_ctx: int | None = None  # Context window size
+
+
 class Settings(BaseSettings):
     """Application configuration loaded from environment variables."""
 
@@ -9,14 +21,56 @@ class Settings(BaseSettings):
     CHROMA_PORT: int
     VECTOR_STORE_PATH: str
 
+    # Catalog collection alias read by the service, and how often it is re-read
+    COLLECTION_NAME: str = "products"
+    COLLECTION_ALIAS_TTL_SECONDS: float = 30.0
+
     # Retrieval configuration
     RETRIEVAL_TOP_K: int = 3
 
+    # Product catalog source, also used to learn the filterable metadata values
+    PRODUCT_CSV_PATH: str = "data/product_description.csv"
+
+    # Reindexing: embedding batch size and throughput cap (0 disables throttling),
+    # collection versions kept for rollback (at least 2), latency probe interval (0 disables)
+    INGEST_BATCH_SIZE: int = 16
+    INGEST_MAX_DOCS_PER_SECOND: float = 0.0
+    INGEST_KEEP_VERSIONS: int = 2
+    INGEST_PROBE_INTERVAL_SECONDS: float = 1.0
+
     # Ollama model configuration
     EMBEDDING_MODEL_NAME: str
     OLLAMA_MODEL: str
     OLLAMA_BASE_URL: str
 
+    # Generation model tiers, smallest first; empty means OLLAMA_MODEL for everything
+    MODEL_TIERS: list[ModelTier] = []
+
+    # Token budget of the unsummarized conversation history sent to the model
+    HISTORY_WINDOW_TOKENS: int = 8192
+
+    # Conversation checkpoint storage ("sqlite" is shared by all worker processes)
+    CHECKPOINT_BACKEND: Literal["memory", "sqlite"] = "memory"
+    CHECKPOINT_PATH: str = "checkpoints.sqlite"
+
+    # Share one graph run between concurrent identical first-turn questions
+    COALESCE_REQUESTS: bool = True
+
+    # Upstream resilience: total time budget per request and timeout per call
+    REQUEST_TIMEOUT_SECONDS: float = 90.0
+    EMBEDDING_TIMEOUT_SECONDS: float = 5.0
+    SEARCH_TIMEOUT_SECONDS: float = 5.0
+    GENERATION_TIMEOUT_SECONDS: float = 60.0
+    # Retries with jittered backoff for embedding and search calls, embedding hedge
+    # delay (0 disables), and consecutive failures before a circuit breaker opens
+    RETRY_ATTEMPTS: int = 2
+    RETRY_BASE_DELAY_SECONDS: float = 0.2
+    EMBEDDING_HEDGE_AFTER_SECONDS: float = 1.0
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_SECONDS: float = 30.0
+    # Worker threads per upstream service; a stuck service can only exhaust its own
+    UPSTREAM_MAX_WORKERS: int = 16
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
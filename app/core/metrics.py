@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+# Upstream calls made by the current request, see ``count_upstream_calls``
+_upstream_tally: ContextVar[Counter | None] = ContextVar("upstream_tally", default=None)
+
+
+class Metrics:
+    """Thread-safe in-process counters and latency timings.
+
+    Timings keep their totals plus a bounded window of recent samples used for
+    percentiles. Values are per process; with several workers each reports its own.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: dict[str, int] = defaultdict(int)
+        self._timings: dict[str, dict[str, Any]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to the counter ``name``."""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one latency sample for the timing ``name``."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = {"count": 0, "total": 0.0, "max": 0.0}
+                timing["recent"] = deque(maxlen=self._window)
+                self._timings[name] = timing
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            timing["recent"].append(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and record it under ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def upstream_call(self, name: str) -> None:
+        """Count one call to an upstream service (Ollama, ChromaDB) as ``upstream.<name>``.
+
+        The call is also added to the tally of the enclosing ``count_upstream_calls``.
+        """
+        self.increment(f"upstream.{name}")
+        tally = _upstream_tally.get()
+        if tally is not None:
+            tally[name] += 1
+
+    def counter(self, name: str) -> int:
+        """Return the current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a JSON-serializable copy of all counters and timing summaries."""
+        with self._lock:
+            timings = {}
+            for name, timing in self._timings.items():
+                recent = sorted(timing["recent"])
+                timings[name] = {
+                    "count": timing["count"],
+                    "mean": timing["total"] / timing["count"],
+                    "p50": recent[int(0.50 * (len(recent) - 1))],
+                    "p95": recent[int(0.95 * (len(recent) - 1))],
+                    "max": timing["max"],
+                }
+            return {"counters": dict(self._counters), "timings": timings}
+
+    def reset(self) -> None:
+        """Clear all counters and timings."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+@contextmanager
+def count_upstream_calls() -> Iterator[Counter]:
+    """Tally the upstream calls made in the enclosed block, by service call name.
+
+    The tally follows the context into threads started with a copy of it, which
+    is how both ``asyncio.to_thread`` and the graph executor run their work.
+    """
+    tally: Counter = Counter()
+    token = _upstream_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _upstream_tally.reset(token)
+
+
+metrics = Metrics()
@@ -0,0 +1,213 @@
+import re
+from typing import Any
+from app.catalog import CatalogVocabulary, get_vocabulary
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_NUMBER = r"(?P<value>\d+(?:\.\d+)?)"
+_MAX_WORDS = r"under|below|less than|cheaper than|at most|up to|no more than|max(?:imum)?"
+_MIN_WORDS = r"over|above|more than|greater than|at least|min(?:imum)?"
+_CMP = rf"\b(?P<cmp>{_MAX_WORDS}|{_MIN_WORDS})\b"
+_POST = r"(?P<post>less|under|below|cheaper|more|over|above|up)"
+_CURRENCY = r"(?:dollars?|usd|bucks)\b"
+# Numbers followed by a unit are durations, sizes or counts, never prices
+_NOT_PRICE = (
+    r"(?!\d|\.\d|\s*(?:%|percent\b|(?:days?|weeks?|months?|years?|hours?|minutes?|gb|tb|mb|"
+    r"inch(?:es)?|cm|mm|kg|g|lbs?|oz|ml|l|people|persons?|stars?|items?|units?|pieces?|"
+    r"pcs|pack)\b))"
+)
+_PRICE_WORDS = r"\b(?:price[ds]?|pricing|costs?|costing|budget|spend|pay|paying)\b"
+
+_RATING_PATTERNS = [
+    re.compile(
+        rf"(?:{_CMP}\s*)?\b(?P<value>[0-5](?:\.\d+)?)\s*(?P<plus>\+)?\s*stars?"
+        r"(?:\s*(?P<post>or (?:more|higher|better|above)|and (?:up|above)|"
+        r"or (?:less|lower|below)))?"
+    ),
+    re.compile(
+        rf"(?:rated|ratings?)\s*(?:of\s*)?(?:{_CMP}\s*)?"
+        r"\b(?P<value>[0-5](?:\.\d+)?)(?!\d|\.\d)\s*(?P<plus>\+)?"
+    ),
+]
+_WELL_RATED = re.compile(r"\b(?:well|highly|top|best)[ -]rated\b")
+
+_PRICE_RANGE_PATTERNS = [
+    re.compile(
+        r"between\s*\$?\s*(?P<low>\d+(?:\.\d+)?)\s*(?:and|to|-)\s*\$?\s*(?P<high>\d+(?:\.\d+)?)"
+    ),
+    re.compile(r"\$\s*(?P<low>\d+(?:\.\d+)?)\s*(?:-|to)\s*\$?\s*(?P<high>\d+(?:\.\d+)?)"),
+]
+# A bare number is only a price when marked as one: a "$", a currency word, "cheaper
+# than", or a price word shortly before the comparison ("costing less than 5")
+_PRICE_PATTERNS = [
+    re.compile(rf"{_CMP}\s*\$\s*{_NUMBER}(?!\d|\.\d)"),
+    re.compile(rf"{_CMP}\s*{_NUMBER}\s*{_CURRENCY}"),
+    re.compile(rf"\b(?P<cmp>cheaper than)\s*{_NUMBER}{_NOT_PRICE}"),
+    re.compile(rf"{_PRICE_WORDS}[^.?!$\d]{{0,20}}?{_CMP}\s*{_NUMBER}{_NOT_PRICE}"),
+    re.compile(rf"\$\s*{_NUMBER}\s*(?:or|and)\s*{_POST}"),
+    re.compile(rf"{_NUMBER}\s*{_CURRENCY}\s*(?:or|and)\s*{_POST}"),
+]
+
+# Yes/no questions about an already identified product ("is it in stock?") must
+# not be turned into a stock filter, or an out-of-stock product would vanish
+# from the results instead of being reported as unavailable.
+_ITEM_QUESTION = re.compile(r"^(?:is|are|does|do)\s+(?:it|this|that|they|these|those|the)\b")
+
+
+def _is_max(cmp: str | None, post: str | None) -> bool:
+    """Tell whether a comparison phrase expresses an upper bound."""
+    if cmp:
+        return re.fullmatch(_MAX_WORDS, cmp) is not None
+    return post is not None and post.split()[-1] in ("less", "lower", "below", "under", "cheaper")
+
+
+def _singular_forms(word: str) -> list[str]:
+    """Return the word together with its naive singular forms."""
+    forms = [word]
+    if word.endswith("ies"):
+        forms.append(word[:-3] + "y")
+    elif word.endswith(("ches", "shes", "xes")):
+        forms.append(word[:-2])
+    if word.endswith("s") and not word.endswith("ss"):
+        forms.append(word[:-1])
+    return forms
+
+
+def _category_aliases(category: str, all_categories: tuple[str, ...]) -> list[str]:
+    """Build the phrases a user may use to refer to a catalog category.
+
+    "mens-watches" is matched by "mens watches" and, because no other category
+    ends with the same noun, by "watches" and "watch".
+    """
+    words = category.lower().split("-")
+    aliases = [" ".join(words)]
+    head = words[-1]
+    if len(words) > 1 and sum(c.lower().split("-")[-1] == head for c in all_categories) == 1:
+        aliases.append(head)
+    return [
+        " ".join(alias.split()[:-1] + [form])
+        for alias in aliases
+        for form in _singular_forms(alias.split()[-1])
+    ]
+
+
+def _match_categories(text: str, vocabulary: CatalogVocabulary) -> list[str]:
+    """Find the catalog categories mentioned in a normalized question."""
+    matched = []
+    for category in vocabulary.categories:
+        aliases = _category_aliases(category, vocabulary.categories)
+        if any(re.search(rf"\b{re.escape(alias)}\b", text) for alias in aliases):
+            matched.append(category)
+    return matched
+
+
+def _match_brands(question: str, vocabulary: CatalogVocabulary) -> list[str]:
+    """Find the catalog brands mentioned in the question.
+
+    Single-word brands are matched case-sensitively so that common words such as
+    "apple" keep referring to the grocery item rather than the brand.
+    """
+    matched = []
+    for brand in vocabulary.brands:
+        flags = re.IGNORECASE if " " in brand else 0
+        if re.search(rf"(?<!\w){re.escape(brand)}(?!\w)", question, flags):
+            matched.append(brand)
+    return matched
+
+
+def _extract_rating(text: str) -> tuple[dict[str, Any] | None, str]:
+    """Extract a rating condition, returning it with the matched span removed."""
+    for pattern in _RATING_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            groups = match.groupdict()
+            op = "$lte" if _is_max(groups.get("cmp"), groups.get("post")) else "$gte"
+            remaining = text[: match.start()] + text[match.end() :]
+            return {"rating": {op: float(groups["value"])}}, remaining
+    if _WELL_RATED.search(text):
+        return {"rating": {"$gte": 4.0}}, text
+    return None, text
+
+
+def _extract_price(text: str) -> list[dict[str, Any]]:
+    """Extract price bound conditions from a normalized question."""
+    for pattern in _PRICE_RANGE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            low, high = sorted((float(match.group("low")), float(match.group("high"))))
+            return [{"price": {"$gte": low}}, {"price": {"$lte": high}}]
+    for pattern in _PRICE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            groups = match.groupdict()
+            op = "$lte" if _is_max(groups.get("cmp"), groups.get("post")) else "$gte"
+            return [{"price": {op: float(groups["value"])}}]
+    return []
+
+
+def _extract_availability(text: str) -> dict[str, Any] | None:
+    """Extract an availability condition unless the question targets a known item."""
+    if _ITEM_QUESTION.match(text):
+        return None
+    if re.search(r"\bout of stock\b", text):
+        return {"availabilityStatus": "Out of Stock"}
+    if re.search(r"\blow (?:in )?stock\b", text):
+        return {"availabilityStatus": "Low Stock"}
+    if re.search(r"\bin stock\b|\bavailable now\b", text):
+        return {"stock": {"$gt": 0}}
+    return None
+
+
+def extract_filters(
+    question: str, vocabulary: CatalogVocabulary | None = None
+) -> dict[str, Any] | None:
+    """Parse metadata constraints from a question into a ChromaDB ``where`` clause.
+
+    Recognizes catalog categories and brands, price bounds and ranges, rating
+    thresholds and availability. Categories and brands are only matched against
+    the values actually present in the catalog.
+
+    Args:
+        question (str): Latest user question.
+        vocabulary (CatalogVocabulary | None): Known catalog values. Defaults to the
+            vocabulary loaded from the product CSV.
+
+    Returns:
+        dict[str, Any] | None: ``where`` clause for the vector store, or None when
+        the question carries no recognizable constraint.
+    """
+    if not question or question.isspace():
+        return None
+    if vocabulary is None:
+        vocabulary = get_vocabulary()
+
+    text = re.sub(r"[’']", "", question.lower()).strip()
+    conditions: list[dict[str, Any]] = []
+
+    categories = _match_categories(text, vocabulary)
+    if categories:
+        category = categories[0] if len(categories) == 1 else {"$in": categories}
+        conditions.append({"category": category})
+
+    brands = _match_brands(question, vocabulary)
+    if brands:
+        brand = brands[0] if len(brands) == 1 else {"$in": brands}
+        conditions.append({"brand": brand})
+
+    rating, text = _extract_rating(text)
+    if rating:
+        conditions.append(rating)
+
+    conditions.extend(_extract_price(text))
+
+    availability = _extract_availability(text)
+    if availability:
+        conditions.append(availability)
+
+    if not conditions:
+        return None
+
+    where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    logger.debug("Extracted filters: %s", where)
+    return where
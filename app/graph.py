@@ -1,31 +1,81 @@
+import sqlite3
 from langgraph.graph import StateGraph, END, START
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.leases import ThreadLeases
 import app.agents as agents
 
 logger = get_logger(__name__)
 
 
-def _build_agent_graph() -> StateGraph:
+def _build_checkpointer() -> BaseCheckpointSaver:
+    """Create the checkpointer selected by ``CHECKPOINT_BACKEND``.
+
+    The in-memory saver is private to the process, so it only supports a single
+    worker. The SQLite saver stores conversations in a file shared by every worker
+    process on the host, letting any worker serve any turn of a conversation.
+
+    Returns:
+        BaseCheckpointSaver: Checkpointer for conversation state persistence.
+    """
+    if settings.CHECKPOINT_BACKEND == "sqlite":
+        logger.info("Using SQLite checkpointer at %s", settings.CHECKPOINT_PATH)
+        conn = sqlite3.connect(settings.CHECKPOINT_PATH, check_same_thread=False, timeout=30)
+        # WAL lets readers in other workers proceed while one worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        checkpointer = SqliteSaver(conn)
+        checkpointer.setup()
+        return checkpointer
+
+    return InMemorySaver()
+
+
+def _build_thread_leases() -> ThreadLeases | None:
+    """Create the cross-worker thread leases when checkpoints are shared.
+
+    The in-memory checkpointer serves a single worker, whose turns are serialized
+    in process. With the SQLite store, any worker may serve any turn, so leases in
+    the same file keep the turns of one conversation from overlapping.
+
+    Returns:
+        ThreadLeases | None: Leases next to the SQLite checkpoints, or None.
+    """
+    if settings.CHECKPOINT_BACKEND == "sqlite":
+        # A turn never outlives its request budget; the margin covers the checkpoint write
+        return ThreadLeases(settings.CHECKPOINT_PATH, ttl=2 * settings.REQUEST_TIMEOUT_SECONDS)
+    return None
+
+
+def _build_agent_graph() -> CompiledStateGraph:
     """Construct the multi-agent workflow graph.
 
-    Creates a sequential workflow: summarizer -> retriever -> responder
-    with in-memory checkpointing for conversation state persistence.
+    Creates a sequential workflow: accountant -> summarizer -> retriever -> responder
+    -> compactor with checkpointing for conversation state persistence. The
+    accountant keeps token counts of the history up to date, and the compactor drops
+    per-turn fields so that only compact state is checkpointed.
 
     Returns:
-        StateGraph: Compiled agent graph ready for execution.
+        CompiledStateGraph: Compiled agent graph ready for execution.
     """
-    checkpointer = InMemorySaver()
+    checkpointer = _build_checkpointer()
     builder = StateGraph(agents.State)
 
-    builder.add_node("summarizer", agents.summarizer_node)
+    builder.add_node("accountant", agents.account_history)
+    builder.add_node("summarizer", agents.summarize_history)
     builder.add_node("retriever", agents.retriever_agent)
     builder.add_node("responder", agents.responder_agent)
+    builder.add_node("compactor", agents.compact_state)
 
-    builder.add_edge(START, "summarizer")
+    builder.add_edge(START, "accountant")
+    builder.add_edge("accountant", "summarizer")
     builder.add_edge("summarizer", "retriever")
     builder.add_edge("retriever", "responder")
-    builder.add_edge("responder", END)
+    builder.add_edge("responder", "compactor")
+    builder.add_edge("compactor", END)
 
     graph = builder.compile(checkpointer=checkpointer)
 
@@ -37,3 +87,4 @@ def _build_agent_graph() -> StateGraph:
 
 
 agent_graph = _build_agent_graph()
+thread_leases = _build_thread_leases()
@@ -0,0 +1,67 @@
+from typing import Sequence
+from langchain_core.messages import AnyMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+# Key of the cached token count in a message's response_metadata
+TOKEN_COUNT_KEY = "token_count"
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Return the token count of a message, from its cache when it has one."""
+    cached = message.response_metadata.get(TOKEN_COUNT_KEY)
+    if cached is None:
+        return count_tokens_approximately([message])
+    return cached
+
+
+def count_tokens_cached(messages: Sequence[BaseMessage]) -> int:
+    """Token counter for the summarizer that reuses cached per-message counts."""
+    return sum(message_tokens(m) for m in messages)
+
+
+def with_token_count(message: AnyMessage) -> AnyMessage:
+    """Return the message with its token count cached in ``response_metadata``.
+
+    The count is computed once; the same id lets the messages reducer replace
+    the uncounted message in state.
+    """
+    if TOKEN_COUNT_KEY in message.response_metadata:
+        return message
+    count = count_tokens_approximately([message])
+    return message.model_copy(
+        update={"response_metadata": {**message.response_metadata, TOKEN_COUNT_KEY: count}}
+    )
+
+
+def advance_window(
+    window: Sequence[BaseMessage], total: int, last_summarized_id: str | None, max_tokens: int
+) -> tuple[int, int]:
+    """Find how many messages leave the history window, and its new token count.
+
+    Messages up to ``last_summarized_id`` are covered by the running summary. If the
+    window still exceeds ``max_tokens``, for example because summarization failed,
+    the oldest messages are dropped as well. Counts come from the message caches,
+    so no message is tokenized again.
+
+    Args:
+        window (Sequence[BaseMessage]): Counted messages of the current window.
+        total (int): Token count of the window.
+        last_summarized_id (str | None): Id of the last message in the running summary.
+        max_tokens (int): Token budget of the window.
+
+    Returns:
+        tuple[int, int]: Number of messages leaving the window and its new token count.
+    """
+    start = 0
+    if last_summarized_id is not None:
+        for index, message in enumerate(window):
+            if message.id == last_summarized_id:
+                total -= sum(message_tokens(m) for m in window[: index + 1])
+                start = index + 1
+                break
+
+    # Always keep the latest message, whatever its size
+    while total > max_tokens and start < len(window) - 1:
+        total -= message_tokens(window[start])
+        start += 1
+    return start, total
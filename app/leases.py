@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import threading
+import time
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ThreadLeases:
+    """Cross-process lease per conversation thread, stored in a SQLite file.
+
+    Workers sharing the SQLite checkpoint store take the lease of a thread before
+    running one of its turns, so turns of one conversation never overlap even when
+    they reach different workers. A lease expires after ``ttl`` seconds, so that a
+    worker that dies mid-turn does not block its conversations for good.
+
+    The lease is owned by the process, so callers within one process must already
+    be serialized per thread, e.g. with ``KeyedLock``.
+    """
+
+    def __init__(self, path: str, ttl: float, poll_seconds: float = 0.05):
+        self.ttl = ttl
+        self.poll_seconds = poll_seconds
+        self._owner = f"{os.getpid()}-{id(self)}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_leases ("
+            "thread_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def try_acquire(self, thread_id: str) -> bool:
+        """Take the lease of a thread if it is free or expired.
+
+        Returns:
+            bool: Whether the lease is now held by this process.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO thread_leases (thread_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET "
+                "owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE thread_leases.expires_at < ?",
+                (thread_id, self._owner, now + self.ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, thread_id: str) -> None:
+        """Give the lease of a thread back, unless it expired and was taken over."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM thread_leases WHERE thread_id = ? AND owner = ?",
+                (thread_id, self._owner),
+            )
+
+    def acquire(self, thread_id: str, timeout: float) -> None:
+        """Take the lease of a thread, waiting for another worker's turn to finish.
+
+        Args:
+            thread_id (str): Conversation thread.
+            timeout (float): Seconds to wait for the lease.
+
+        Raises:
+            TimeoutError: If the lease could not be taken within ``timeout``.
+        """
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire(thread_id):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Thread '{thread_id}' is busy in another worker")
+            logger.debug("Thread '%s' is busy in another worker, waiting", thread_id)
+            time.sleep(self.poll_seconds)
@@ -1,27 +1,165 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from fastapi import FastAPI, HTTPException
+from app.agents import TRANSIENT_KEYS, warm_up
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import count_upstream_calls, metrics
 from app.core.models import QueryRequest, QueryResponse
-from app.graph import agent_graph
-from langchain_core.messages import HumanMessage
+from app.graph import agent_graph, thread_leases
+from app.history import count_tokens_cached, with_token_count
+from app.resilience import breaker_states, request_deadline
+from app.singleflight import KeyedLock, SingleFlight
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
 
 logger = get_logger(__name__)
 
+_first_turns: SingleFlight[tuple[str, dict[str, Any], int]] = SingleFlight()
+
+# Turns of one conversation read and write the same checkpoint, so they run one at a time
+_thread_turns = KeyedLock()
+
+
+@asynccontextmanager
+async def _exclusive_turn(thread_id: str) -> AsyncIterator[None]:
+    """Hold a conversation for one turn, against turns in this and other workers.
+
+    Held from the checkpoint read to the write, so that no turn of the thread is lost.
+    """
+    async with _thread_turns.hold(thread_id):
+        if thread_leases is None:
+            yield
+            return
+        await asyncio.to_thread(thread_leases.acquire, thread_id, settings.REQUEST_TIMEOUT_SECONDS)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(thread_leases.release, thread_id)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Load models, clients and indexes before the worker accepts requests."""
+    warm_up()
+    yield
+
+
 app = FastAPI(
     title="Product Query Bot",
     description="A microservice to answer product questions using a multi-agent system",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
 @app.get("/health", summary="Health Check")
-def health_check() -> dict[str, str]:
+def health_check() -> dict[str, Any]:
     """Check service health status.
 
+    The service is "degraded" while a circuit breaker to Ollama or ChromaDB is
+    not closed; it still answers, from lexical search or cached answers.
+
+    Returns:
+        dict[str, Any]: Status message and the state of each circuit breaker.
+    """
+    breakers = breaker_states()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "breakers": breakers}
+
+
+@app.get("/metrics", summary="Service Metrics")
+def get_metrics() -> dict:
+    """Report in-process counters and latency timings.
+
+    Returns:
+        dict: Counters and timing summaries of the worker serving the request.
+    """
+    snapshot = metrics.snapshot()
+    eligible = metrics.counter("coalesce.eligible")
+    snapshot["coalescing_rate"] = metrics.counter("coalesce.joined") / eligible if eligible else 0.0
+    return snapshot
+
+
+def _coalescing_key(question: str) -> str:
+    """Normalize a question so that trivially different spellings share a run."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def _run_graph(inputs: dict[str, Any], config: RunnableConfig) -> tuple[dict[str, Any], int]:
+    """Run one conversation turn within the request budget, counting its upstream calls.
+
+    Returns:
+        tuple[dict[str, Any], int]: Final graph state and number of upstream calls.
+    """
+    with request_deadline(settings.REQUEST_TIMEOUT_SECONDS), count_upstream_calls() as tally:
+        # Checkpoint only once the turn completes, after transient fields are dropped
+        final_state = agent_graph.invoke(inputs, config=config, durability="exit")  # type: ignore
+    return final_state, sum(tally.values())
+
+
+async def _run_turn(query: str, config: RunnableConfig) -> dict[str, Any]:
+    """Answer one turn, sharing the run with identical concurrent first-turn questions.
+
+    Only questions without prior conversation state are coalesced, since their
+    answer does not depend on the thread. A joining request gets the leader's
+    answer and writes it as the first turn of its own thread.
+
+    Args:
+        query (str): User question.
+        config (RunnableConfig): Config carrying the thread_id of the conversation.
+
     Returns:
-        dict[str, str]: Status message indicating service is operational.
+        dict[str, Any]: Final conversation state of the thread.
     """
-    return {"status": "ok"}
+    inputs = {"messages": [HumanMessage(content=query)]}
+    logger.debug("Processing inputs: %s", inputs)
+
+    if settings.COALESCE_REQUESTS:
+        snapshot = await asyncio.to_thread(agent_graph.get_state, config)
+        if not snapshot.values.get("messages"):
+            return await _run_first_turn(query, inputs, config)
+
+    final_state, _ = await asyncio.to_thread(_run_graph, inputs, config)
+    return final_state
+
+
+async def _run_first_turn(
+    query: str, inputs: dict[str, Any], config: RunnableConfig
+) -> dict[str, Any]:
+    """Run a first turn through the single-flight group of its normalized question."""
+    thread_id = config["configurable"]["thread_id"]
+
+    async def lead() -> tuple[str, dict[str, Any], int]:
+        final_state, calls = await asyncio.to_thread(_run_graph, inputs, config)
+        return thread_id, final_state, calls
+
+    metrics.increment("coalesce.eligible")
+    (leader_thread, final_state, calls), joined = await _first_turns.do(
+        _coalescing_key(query), lead
+    )
+    if not joined or leader_thread == thread_id:
+        return final_state
+
+    metrics.increment("coalesce.joined")
+    metrics.increment("coalesce.upstream_calls_saved", calls)
+    logger.info("Coalesced first turn of '%s' with '%s'", thread_id, leader_thread)
+
+    values = {
+        key: value
+        for key, value in final_state.items()
+        if key not in TRANSIENT_KEYS and value is not None
+    }
+    values["messages"] = [
+        with_token_count(HumanMessage(content=query)),
+        *final_state["messages"][1:],
+    ]
+    values["history_tokens"] = count_tokens_cached(
+        values["messages"][: values.get("history_counted") or 0]
+    )
+    await asyncio.to_thread(agent_graph.update_state, config, values, as_node="compactor")
+    return values
 
 
 @app.post("/query", response_model=QueryResponse, summary="Process a user query")
@@ -43,11 +181,14 @@ async def handle_query(request: QueryRequest) -> QueryResponse:
         config: RunnableConfig = {"configurable": {"thread_id": request.user_id}}
         logger.debug("Using thread_id: %s", request.user_id)
 
-        inputs = {"messages": [HumanMessage(content=request.query)]}
-        logger.debug("Processing inputs: %s", inputs)
-
-        final_state = agent_graph.invoke(inputs, config=config)  # type: ignore
-        final_response = final_state.get("generation") or "Sorry, I couldn't generate a response."
+        async with _exclusive_turn(request.user_id):
+            final_state = await _run_turn(request.query, config)
+        last_message = (final_state.get("messages") or [None])[-1]
+        final_response = (
+            last_message.text()
+            if isinstance(last_message, AIMessage) and last_message.text()
+            else "Sorry, I couldn't generate a response."
+        )
 
         return QueryResponse(answer=final_response)
 
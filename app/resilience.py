@@ -0,0 +1,303 @@
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, TypeVar
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Monotonic time by which the current request must be answered, see ``request_deadline``
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+# Upstream calls run in a pool per service, so that a caller can stop waiting for a
+# stuck call and the threads it leaves behind only hold up calls to the same service
+_executors: dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    """An upstream call did not finish within its timeout or the request budget."""
+
+
+class CircuitOpenError(RuntimeError):
+    """An upstream service is failing and calls to it are rejected without trying."""
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker for one upstream service.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and rejects
+    calls for ``reset_seconds``. It then lets a single trial call through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """Return "closed", "open" or "half_open"."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        """Admit a call or reject it.
+
+        Raises:
+            CircuitOpenError: If the breaker is open or a half-open trial is running.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+        metrics.increment(f"resilience.rejected.{self.name}")
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit '%s' closed", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End an admitted call that was never made, without counting it."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker at the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "Circuit '%s' opened after %d failures", self.name, self._failures
+                    )
+                    metrics.increment(f"resilience.opened.{self.name}")
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the state and consecutive failure count."""
+        with self._lock:
+            return {"state": self._state(), "failures": self._failures}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the circuit breaker of an upstream service, creating it on first use.
+
+    Args:
+        name (str): Upstream service name, e.g. "chroma".
+
+    Returns:
+        CircuitBreaker: Breaker shared by every caller in the process.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name, settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> dict[str, dict[str, Any]]:
+    """Return the snapshot of every circuit breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """Give the enclosed block a total time budget for its upstream calls.
+
+    Like ``count_upstream_calls``, the deadline follows the context into the
+    threads that run graph nodes.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> float | None:
+    """Return the seconds left in the request budget, or None outside a request."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.UPSTREAM_MAX_WORKERS, thread_name_prefix=f"upstream-{name}"
+            )
+            _executors[name] = executor
+        return executor
+
+
+def _submit(name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+    context = contextvars.copy_context()
+    return _get_executor(name).submit(context.run, fn, *args, **kwargs)
+
+
+def _call_with_timeout(
+    name: str, limit: float, hedge_after: float, fn: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """Run one attempt of a call, optionally hedged, bounded by ``limit`` seconds."""
+    deadline = time.monotonic() + limit
+    pending = {_submit(name, fn, *args, **kwargs)}
+    if 0 < hedge_after < limit:
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            # A duplicate request often beats a straggler; the first result wins
+            metrics.increment(f"resilience.hedged.{name}")
+            pending.add(_submit(name, fn, *args, **kwargs))
+
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(
+            pending, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED
+        )
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+    if error is not None and not pending:
+        raise error
+    metrics.increment(f"resilience.timeout.{name}")
+    raise DeadlineExceeded(f"'{name}' did not answer within {limit:.1f}s")
+
+
+def guarded_call(
+    name: str,
+    fn: Callable[..., T],
+    *args: Any,
+    timeout: float,
+    retries: int = 0,
+    hedge_after: float = 0.0,
+    **kwargs: Any,
+) -> T:
+    """Call an upstream service through its circuit breaker with a deadline.
+
+    Each attempt is bounded by ``timeout`` and by what is left of the request
+    budget. Failed attempts are retried after an exponential backoff with full
+    jitter, so only idempotent calls should set ``retries``. The breaker counts
+    one failure per call once its retries are exhausted; a call that runs out of
+    budget before reaching the upstream is not counted.
+
+    Args:
+        name (str): Upstream service name, selecting the circuit breaker.
+        fn (Callable[..., T]): Call to make, run in a worker thread.
+        *args (Any): Positional arguments for ``fn``.
+        timeout (float): Seconds allowed per attempt.
+        retries (int): Extra attempts after a failure.
+        hedge_after (float): Seconds after which a duplicate attempt is started, 0 to disable.
+        **kwargs (Any): Keyword arguments for ``fn``.
+
+    Returns:
+        T: Result of ``fn``.
+
+    Raises:
+        CircuitOpenError: If the breaker rejects the call.
+        DeadlineExceeded: If the last attempt timed out.
+    """
+    breaker = get_breaker(name)
+    breaker.before_call()
+
+    for attempt in range(retries + 1):
+        budget = remaining_budget()
+        limit = timeout if budget is None else min(timeout, budget)
+        if limit <= 0:
+            # Only failed attempts, if any, are the upstream's fault
+            if attempt == 0:
+                breaker.release()
+            else:
+                breaker.record_failure()
+            raise DeadlineExceeded(f"No time left in the request budget for '{name}'")
+
+        try:
+            result = _call_with_timeout(name, limit, hedge_after, fn, *args, **kwargs)
+        except Exception as e:
+            delay = random.uniform(0, settings.RETRY_BASE_DELAY_SECONDS * 2**attempt)
+            budget = remaining_budget()
+            if attempt == retries or (budget is not None and budget <= delay):
+                breaker.record_failure()
+                raise
+            logger.warning("Call to '%s' failed (%s), retrying in %.2fs", name, e, delay)
+            metrics.increment(f"resilience.retried.{name}")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+    raise AssertionError("unreachable")
+
+
+class ResilientEmbeddings(Embeddings):
+    """Embeddings guarded by the "ollama_embeddings" breaker, with retries and hedging.
+
+    Embedding calls are idempotent, so slow ones are hedged with a duplicate
+    request and failed ones are retried.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return guarded_call(
+            "ollama_embeddings",
+            self.embeddings.embed_query,
+            text,
+            timeout=settings.EMBEDDING_TIMEOUT_SECONDS,
+            retries=settings.RETRY_ATTEMPTS,
+            hedge_after=settings.EMBEDDING_HEDGE_AFTER_SECONDS,
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return guarded_call(
+            "ollama_embeddings",
+            self.embeddings.embed_documents,
+            texts,
+            timeout=settings.EMBEDDING_TIMEOUT_SECONDS * max(1, len(texts)),
+            retries=settings.RETRY_ATTEMPTS,
+        )
@@ -0,0 +1,251 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.documents import Document
+from langchain_ollama import ChatOllama
+from app.core.config import ModelTier, settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.resilience import guarded_call
+
+logger = get_logger(__name__)
+
+_COMPARISON = re.compile(
+    r"\b(?:compare|comparison|versus|vs\.?|difference|differences|better|best|cheapest|"
+    r"most expensive|which one|recommend|alternatives?)\b"
+)
+
+# Phrases that signal the model could not answer from the given context
+_ESCALATION_SIGNALS = (
+    "cannot find",
+    "can't find",
+    "could not find",
+    "couldn't find",
+    "don't know",
+    "do not know",
+    "unable to",
+    "not able to",
+    "no information",
+)
+
+_chat_models: dict[str, ChatOllama] = {}
+
+# Recent answers by question and documents, served when generation is unavailable
+_answers: OrderedDict[tuple[str, tuple[str, ...]], str] = OrderedDict()
+_answers_lock = threading.Lock()
+_ANSWER_CACHE_SIZE = 1024
+
+
+def get_tiers() -> list[ModelTier]:
+    """Return the configured model tiers, smallest first.
+
+    Returns:
+        list[ModelTier]: ``MODEL_TIERS``, or a single tier using ``OLLAMA_MODEL``.
+    """
+    if settings.MODEL_TIERS:
+        return settings.MODEL_TIERS
+    return [ModelTier(name="default", model=settings.OLLAMA_MODEL)]
+
+
+def get_chat(tier: ModelTier) -> ChatOllama:
+    """Return the chat model for a tier, creating it on first use.
+
+    Args:
+        tier (ModelTier): Tier whose model and generation limits to use.
+
+    Returns:
+        ChatOllama: Chat model shared by all requests routed to the tier.
+    """
+    chat = _chat_models.get(tier.name)
+    if chat is None:
+        chat = ChatOllama(
+            model=tier.model,
+            temperature=0,
+            base_url=settings.OLLAMA_BASE_URL,
+            num_predict=tier.num_predict,
+            num_ctx=tier.num_ctx,
+            # Closes the connection of a generation abandoned by its deadline
+            client_kwargs={"timeout": settings.GENERATION_TIMEOUT_SECONDS},
+        )
+        _chat_models[tier.name] = chat
+    return chat
+
+
+def is_comparison(question: str) -> bool:
+    """Tell whether a question compares products or asks for a superlative."""
+    return _COMPARISON.search(question.lower()) is not None
+
+
+def estimate_complexity(question: str, docs: List[Document]) -> int:
+    """Score how demanding a question is, without calling a model.
+
+    Long questions and comparisons add to the score, and comparisons across
+    several retrieved products add more.
+
+    Args:
+        question (str): Latest user question.
+        docs (List[Document]): Documents retrieved for the question.
+
+    Returns:
+        int: Complexity score, 0 for short single-product questions.
+    """
+    score = 0
+    n_words = len(question.split())
+    if n_words > 25:
+        score += 1
+    if n_words > 50:
+        score += 1
+
+    if is_comparison(question):
+        score += 1
+        products = {d.metadata.get("title") or d.page_content[:80] for d in docs}
+        if len(products) > 1:
+            score += 1
+
+    return score
+
+
+def prompt_budget(tier: ModelTier) -> int | None:
+    """Return the prompt tokens a tier can take, leaving room for its answer.
+
+    Args:
+        tier (ModelTier): Tier whose ``num_ctx`` and ``num_predict`` to use.
+
+    Returns:
+        int | None: Token budget of the prompt, or None if the context is unbounded.
+    """
+    if tier.num_ctx is None:
+        return None
+    return tier.num_ctx - (tier.num_predict or 0)
+
+
+def select_tier(score: int, prompt_tokens: int = 0) -> int:
+    """Pick the smallest tier able to handle a complexity score and prompt size.
+
+    Ollama truncates prompts longer than its context from the front, dropping the
+    system prompt and product context, so tiers too small for the prompt are skipped.
+
+    Args:
+        score (int): Score from ``estimate_complexity``.
+        prompt_tokens (int): Estimated token count of the prompt.
+
+    Returns:
+        int: Index into ``get_tiers()``; the largest fitting tier when none is adequate,
+        and the tier with the largest context when none fits.
+    """
+    tiers = get_tiers()
+    fitting = [
+        index
+        for index, tier in enumerate(tiers)
+        if (budget := prompt_budget(tier)) is None or prompt_tokens <= budget
+    ]
+    for index in fitting:
+        if score <= tiers[index].max_complexity:
+            return index
+    if fitting:
+        return fitting[-1]
+    logger.warning("No model tier has room for a %d-token prompt", prompt_tokens)
+    return max(range(len(tiers)), key=lambda index: prompt_budget(tiers[index]) or 0)
+
+
+def needs_escalation(answer: str) -> bool:
+    """Tell whether an answer signals that the model could not answer.
+
+    Args:
+        answer (str): Generated answer text.
+
+    Returns:
+        bool: True if a larger model should retry the question.
+    """
+    text = answer.strip().lower()
+    return not text or any(signal in text for signal in _ESCALATION_SIGNALS)
+
+
+def _answer_key(question: str, document_ids: List[str]) -> tuple[str, tuple[str, ...]]:
+    return " ".join(question.lower().split()), tuple(document_ids)
+
+
+def cached_answer(question: str, document_ids: List[str]) -> str | None:
+    """Return the last answer generated for a first-turn question over the same documents.
+
+    Args:
+        question (str): User question.
+        document_ids (List[str]): Ids of the documents the answer was based on.
+
+    Returns:
+        str | None: Cached answer, or None if the question was not answered recently.
+    """
+    with _answers_lock:
+        return _answers.get(_answer_key(question, document_ids))
+
+
+def invoke_chat(runnable: Any, inputs: Any) -> Any:
+    """Invoke a chat model through the "ollama_chat" circuit breaker, within the deadline.
+
+    Generations are not retried: they are expensive and their failures are
+    handled by degrading the answer instead.
+    """
+    return guarded_call(
+        "ollama_chat", runnable.invoke, inputs, timeout=settings.GENERATION_TIMEOUT_SECONDS
+    )
+
+
+def generate(
+    prompt: ChatPromptTemplate,
+    inputs: dict[str, Any],
+    tier_index: int,
+    escalate: bool = True,
+    document_ids: List[str] | None = None,
+) -> str:
+    """Generate an answer starting at a tier, escalating to larger tiers if needed.
+
+    Routing decisions, escalations and per-tier latency are recorded in the
+    application metrics. When ``document_ids`` are given, the answer is remembered
+    for ``cached_answer``; callers only give them for first-turn questions, whose
+    answer does not depend on a conversation and can be shared between users.
+
+    Args:
+        prompt (ChatPromptTemplate): Prompt to render with ``inputs``.
+        inputs (dict[str, Any]): Prompt variables, including the ``question``.
+        tier_index (int): Index of the first tier to try.
+        escalate (bool): Whether unanswered questions may move to a larger tier.
+        document_ids (List[str] | None): Ids of the documents in the prompt context,
+            None to not cache the answer.
+
+    Returns:
+        str: Generated answer text.
+
+    Raises:
+        CircuitOpenError: If the chat model is failing and calls are rejected.
+        DeadlineExceeded: If the generation did not finish in time.
+    """
+    tiers = get_tiers()
+    metrics.increment(f"router.routed.{tiers[tier_index].name}")
+
+    while True:
+        tier = tiers[tier_index]
+        chain = prompt | get_chat(tier)
+
+        with metrics.timer(f"router.latency.{tier.name}"):
+            metrics.upstream_call("generation")
+            response = invoke_chat(chain, inputs)
+
+        answer = getattr(response, "content", str(response))
+        if not (escalate and tier_index + 1 < len(tiers) and needs_escalation(answer)):
+            logger.info("Answered with model tier '%s' (%s)", tier.name, tier.model)
+            if answer.strip() and document_ids is not None:
+                key = _answer_key(str(inputs.get("question", "")), document_ids)
+                with _answers_lock:
+                    _answers[key] = answer
+                    _answers.move_to_end(key)
+                    while len(_answers) > _ANSWER_CACHE_SIZE:
+                        _answers.popitem(last=False)
+            return answer
+
+        tier_index += 1
+        logger.info(
+            "Tier '%s' could not answer, escalating to '%s'", tier.name, tiers[tier_index].name
+        )
+        metrics.increment(f"router.escalated.{tier.name}")
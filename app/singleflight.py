@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Share one in-flight computation between concurrent callers with the same key.
+
+    The first caller for a key runs the computation; callers arriving while it is
+    running wait for it and receive the same result or exception. Nothing is
+    cached: once the computation finishes the next caller starts a new one.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        """Return the number of computations currently running."""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Run ``fn`` for ``key``, or join the run already in flight.
+
+        Args:
+            key (Hashable): Identity of the computation.
+            fn (Callable[[], Awaitable[T]]): Computation to run if none is in flight.
+
+        Returns:
+            tuple[T, bool]: The result, and whether it was shared from another caller.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # Shielded so that a cancelled follower does not cancel the leader's run
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no follower joined
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+
+class KeyedLock:
+    """Async mutual exclusion per key, e.g. so that turns of one conversation run in order.
+
+    Locks are created on first use and dropped once no caller holds or awaits them.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._locks: dict[Hashable, tuple[asyncio.Lock, int]] = {}
+
+    def held(self) -> int:
+        """Return the number of keys currently locked or awaited."""
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        """Hold the lock of ``key`` for the enclosed block, waiting for earlier holders.
+
+        Args:
+            key (Hashable): Identity of the serialized resource.
+        """
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.graph.state import CompiledStateGraph
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import agents, router
+from app import graph as graph_mod
+from app.catalog import CatalogVocabulary
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _load_documents(k: int) -> list[Document]:
+    """Build documents shaped like the ingested ones, raw reviews included."""
+    df = pd.read_csv(settings.PRODUCT_CSV_PATH).head(k)
+    return [
+        Document(
+            id=f"product_{row['id']}",
+            page_content=(
+                f"Product Name: {row['title']}\n"
+                f"Description: {row['description']}\n"
+                f"Category: {row['category']}\n"
+                f"Brand: {row['brand']}"
+            ),
+            metadata={key: value for key, value in row.to_dict().items() if pd.notna(value)},
+        )
+        for _, row in df.iterrows()
+    ]
+
+
+class _FakeVectorStore:
+    """Stands in for ChromaDB, returning the same catalog documents for every query."""
+
+    docs: list[Document] = []
+
+    def similarity_search_by_vector_with_relevance_scores(self, _embedding, k=4, filter=None):
+        return [(doc, 0.25) for doc in self.docs[:k]]
+
+    def get_by_ids(self, ids):
+        return [doc for doc in self.docs if doc.id in ids]
+
+
+class _FakeEmbeddings:
+    def embed_query(self, _text: str) -> list[float]:
+        return [0.0]
+
+
+def _fake_chat(_runnable, inputs):
+    """Answer both the summarizer and the responder without a chat model."""
+    if isinstance(inputs, dict):
+        return AIMessage(content="It costs $9.99 and ships in 3 days. " * 4)
+    return AIMessage(content="Summary of the chat. " * 40)
+
+
+def _build_graph(docs: list[Document], compact: bool) -> CompiledStateGraph:
+    """Compile the agent graph with the upstream services faked.
+
+    Without ``compact`` the compactor keeps every field, as the state was written
+    before transient fields were cleared.
+    """
+    _FakeVectorStore.docs = docs
+    setattr(router, "invoke_chat", _fake_chat)
+    setattr(agents, "EMB", _FakeEmbeddings())
+    setattr(agents, "_get_vectorstore", _FakeVectorStore)
+    setattr(agents, "get_vocabulary", CatalogVocabulary)
+    agents._document_cache.clear()
+
+    compactor = agents.compact_state
+    if not compact:
+        setattr(agents, "compact_state", lambda _state: {})
+    try:
+        return graph_mod._build_agent_graph()
+    finally:
+        setattr(agents, "compact_state", compactor)
+
+
+def _run(graph: CompiledStateGraph, turns: int) -> RunnableConfig:
+    """Run a conversation of the given number of turns through the graph."""
+    config: RunnableConfig = {"configurable": {"thread_id": f"bench-{time.perf_counter()}"}}
+    for i in range(turns):
+        question = HumanMessage(content=f"Question {i}: and what is the price of it?")
+        graph.invoke({"messages": [question]}, config=config, durability="exit")
+    return config
+
+
+def _measure(serde: SerializerProtocol, checkpoint: dict, repeat: int) -> tuple[int, float]:
+    """Return the serialized size in bytes and the mean serialization time in ms."""
+    _, data = serde.dumps_typed(checkpoint)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serde.dumps_typed(checkpoint)
+    return len(data), 1000 * (time.perf_counter() - start) / repeat
+
+
+def bench(turn_counts: list[int], repeat: int) -> None:
+    """Compare the checkpoint the graph writes with the one it wrote before compaction.
+
+    Each conversation is run through the real graph, with only the upstream services
+    faked, and the latest checkpoint of its thread is serialized with the serializer
+    of the checkpointer. The full variant keeps the retrieved documents and every
+    transient field in the checkpoint.
+    """
+    docs = _load_documents(settings.RETRIEVAL_TOP_K)
+    graphs = {compact: _build_graph(docs, compact) for compact in (False, True)}
+
+    for turns in turn_counts:
+        results = {}
+        for compact, graph in graphs.items():
+            config = _run(graph, turns)
+            checkpointer = graph.checkpointer
+            assert checkpointer is not None and not isinstance(checkpointer, bool)
+            checkpoint_tuple = checkpointer.get_tuple(config)
+            assert checkpoint_tuple is not None
+            checkpoint = dict(checkpoint_tuple.checkpoint)
+            results[compact] = _measure(checkpointer.serde, checkpoint, repeat)
+
+        (full_bytes, full_ms), (compact_bytes, compact_ms) = results[False], results[True]
+        logger.info(
+            "turns=%d full: %d B, %.3f ms | compact: %d B, %.3f ms | %.1fx smaller",
+            turns,
+            full_bytes,
+            full_ms,
+            compact_bytes,
+            compact_ms,
+            full_bytes / compact_bytes,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint size and serialization")
+    parser.add_argument("--turns", default="1,10,50", help="Comma-separated conversation lengths")
+    parser.add_argument("--repeat", type=int, default=200, help="Serializations per measurement")
+    args = parser.parse_args()
+
+    bench([int(t) for t in args.turns.split(",")], args.repeat)
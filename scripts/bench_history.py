@@ -0,0 +1,170 @@
+import argparse
+import os
+import sys
+import time
+from typing import cast
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph.message import add_messages
+from langmem.short_term import SummarizationNode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import agents, router
+from app import graph as graph_mod
+from app.catalog import CatalogVocabulary
+from app.core.logger import get_logger
+from app.history import count_tokens_cached, with_token_count
+
+logger = get_logger(__name__)
+
+# Stands in for the summarization model, so that only the history handling is timed
+_FAKE_SUMMARY = RunnableLambda(lambda _messages: AIMessage(content="Summary of the chat. " * 40))
+
+
+def _summarizer(**kwargs) -> SummarizationNode:
+    return SummarizationNode(
+        model=_FAKE_SUMMARY, max_tokens=4096, max_summary_tokens=1024, **kwargs
+    )
+
+
+def _turn(i: int) -> tuple[HumanMessage, AIMessage]:
+    question = HumanMessage(content=f"Question {i}: and what is the warranty of it?", id=f"h{i}")
+    answer = AIMessage(
+        content=f"Answer {i}: the product has a one year warranty and ships in 3 days. " * 5,
+        id=f"a{i}",
+    )
+    return question, answer
+
+
+def bench_full(turns: int) -> list[float]:
+    """Per-turn seconds of the previous flow: summarize over the whole history."""
+    summarizer = _summarizer(token_counter=count_tokens_approximately)
+    messages: list = []
+    context: dict = {}
+    timings = []
+
+    for i in range(turns):
+        question, answer = _turn(i)
+        messages.append(question)
+        start = time.perf_counter()
+        update = summarizer.invoke({"messages": messages, "context": context})
+        timings.append(time.perf_counter() - start)
+        context = update.get("context", context)
+        messages.append(answer)
+    return timings
+
+
+def bench_incremental(turns: int) -> list[float]:
+    """Per-turn seconds of the accountant and summarizer over the history window."""
+    summarizer = _summarizer(token_counter=count_tokens_cached, input_messages_key="history_window")
+    state: dict = {"messages": [], "context": {}}
+    timings = []
+
+    for i in range(turns):
+        question, answer = _turn(i)
+        state["messages"].append(question)
+        start = time.perf_counter()
+        update = agents.account_history(cast(agents.State, state))
+        # Counted messages replace their originals by id, removals drop summarized ones
+        state["messages"] = add_messages(state["messages"], update.pop("messages"))
+        state.update(update)
+        state.update(summarizer.invoke(state))
+        timings.append(time.perf_counter() - start)
+        # The responder caches the count of its answer when it creates it
+        state["messages"].append(with_token_count(answer))
+    return timings
+
+
+class _FakeVectorStore:
+    """Stands in for ChromaDB with a single product."""
+
+    doc = Document(id="product_1", page_content="Essence Mascara Lash Princess", metadata={})
+
+    def similarity_search_by_vector_with_relevance_scores(self, _embedding, k=4, filter=None):
+        return [(self.doc, 0.25)]
+
+    def get_by_ids(self, ids):
+        return [self.doc] if self.doc.id in ids else []
+
+
+class _FakeEmbeddings:
+    def embed_query(self, _text: str) -> list[float]:
+        return [0.0]
+
+
+def _fake_chat(_runnable, inputs):
+    """Answer both the summarizer and the responder without a chat model."""
+    if isinstance(inputs, dict):
+        return AIMessage(content="The product has a one year warranty and ships in 3 days. " * 5)
+    return _FAKE_SUMMARY.invoke(inputs)
+
+
+def bench_graph(turns: int, full_state: bool = False) -> list[float]:
+    """Per-turn seconds of a real ``graph.invoke``, with the upstream services faked.
+
+    With ``full_state`` the retriever returns the whole state, as it used to, so the
+    messages reducer merges the full history on every turn.
+    """
+    setattr(router, "invoke_chat", _fake_chat)
+    setattr(agents, "EMB", _FakeEmbeddings())
+    setattr(agents, "_get_vectorstore", _FakeVectorStore)
+    setattr(agents, "get_vocabulary", CatalogVocabulary)
+    agents._document_cache.clear()
+
+    retriever = agents.retriever_agent
+    if full_state:
+        agents.retriever_agent = lambda state: {**state, **retriever(state)}
+    try:
+        graph = graph_mod._build_agent_graph()
+    finally:
+        agents.retriever_agent = retriever
+
+    config: RunnableConfig = {"configurable": {"thread_id": f"bench-{time.perf_counter()}"}}
+    timings = []
+    for i in range(turns):
+        question, _ = _turn(i)
+        start = time.perf_counter()
+        graph.invoke({"messages": [question]}, config=config, durability="exit")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(name: str, timings: list[float], bucket: int) -> None:
+    """Log the mean per-turn time of each bucket of turns, and the last to first ratio."""
+    means = []
+    for end in range(bucket, len(timings) + 1, bucket):
+        window = timings[end - bucket : end]
+        means.append((f"{end - bucket + 1}-{end}", sum(window) / len(window)))
+    buckets = " | ".join(f"{label}: {1e6 * mean:7.0f}" for label, mean in means)
+    logger.info("%s per-turn us | %s | growth %.2fx", name, buckets, means[-1][1] / means[0][1])
+
+
+def bench(turns: int, bucket: int, repeat: int) -> None:
+    """Compare the per-turn history overhead of the flows over a long conversation.
+
+    The first two flows time the history handling only; the last two time a whole
+    graph turn. Each flow is run ``repeat`` times and the fastest time of every turn
+    is kept.
+    """
+    flows = (
+        ("full", bench_full),
+        ("incremental", bench_incremental),
+        ("graph, full state", lambda n: bench_graph(n, full_state=True)),
+        ("graph", bench_graph),
+    )
+    for name, run in flows:
+        runs = [run(turns) for _ in range(repeat)]
+        _report(name, [min(samples) for samples in zip(*runs)], bucket)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-turn history token accounting")
+    parser.add_argument("--turns", type=int, default=200, help="Conversation length")
+    parser.add_argument("--bucket", type=int, default=25, help="Turns averaged per reported bucket")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per flow, fastest kept")
+    args = parser.parse_args()
+
+    bench(args.turns, args.bucket, args.repeat)
@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+QUERIES = [
+    "Annibale Colombo Sofa",
+    "beauty products under $15",
+    "what's in stock from Essence",
+    "Rolex watches with at least 4 stars",
+    "laptops between $1000 and $2000",
+]
+FOLLOW_UP = "and what is the price?"
+
+
+def _start_server(workers: int, port: int, checkpoint_path: str) -> subprocess.Popen:
+    """Launch uvicorn with the given number of workers sharing one checkpoint store."""
+    env = dict(
+        os.environ,
+        CHECKPOINT_BACKEND="sqlite",
+        CHECKPOINT_PATH=checkpoint_path,
+    )
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 120.0) -> None:
+    """Poll the health endpoint until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Server did not become ready")
+
+
+async def _run_load(
+    client: httpx.AsyncClient, users: int, concurrency: int, run_id: str
+) -> tuple[float, list[float], int]:
+    """Run a two-turn conversation per user and collect per-request latencies.
+
+    The follow-up turn checks that conversation state is found regardless of which
+    worker handles it: a clarification request means the thread was lost.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    lost_threads = 0
+
+    async def conversation(i: int) -> None:
+        nonlocal lost_threads
+        user_id = f"bench-{run_id}-{i}"
+        async with semaphore:
+            for query in (QUERIES[i % len(QUERIES)], FOLLOW_UP):
+                start = time.perf_counter()
+                resp = await client.post("/query", json={"user_id": user_id, "query": query})
+                latencies.append(time.perf_counter() - start)
+                resp.raise_for_status()
+            answer = resp.json()["answer"].lower()
+            if "which product" in answer or "what product" in answer:
+                lost_threads += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(users)))
+    return time.perf_counter() - start, latencies, lost_threads
+
+
+async def bench(worker_counts: list[int], users: int, concurrency: int, port: int) -> None:
+    """Measure throughput for each worker count and report scaling efficiency."""
+    results = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = _start_server(workers, port, os.path.join(tmp, "checkpoints.sqlite"))
+            try:
+                async with httpx.AsyncClient(
+                    base_url=f"http://127.0.0.1:{port}", timeout=600.0
+                ) as client:
+                    await _wait_ready(client)
+                    elapsed, latencies, lost = await _run_load(
+                        client, users, concurrency, f"w{workers}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+        throughput = len(latencies) / elapsed
+        quantiles = statistics.quantiles(latencies, n=100)
+        results.append((workers, throughput))
+        logger.info(
+            "workers=%d requests=%d throughput=%.2f req/s p50=%.3fs p95=%.3fs lost_threads=%d",
+            workers,
+            len(latencies),
+            throughput,
+            quantiles[49],
+            quantiles[94],
+            lost,
+        )
+
+    base_workers, base_throughput = results[0]
+    for workers, throughput in results:
+        speedup = throughput / base_throughput
+        logger.info(
+            "workers=%d speedup=%.2fx efficiency=%.0f%%",
+            workers,
+            speedup,
+            100 * speedup * base_workers / workers,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark throughput scaling with workers")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--users", type=int, default=64, help="Conversations per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent conversations")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    asyncio.run(
+        bench(
+            [int(w) for w in args.workers.split(",")],
+            args.users,
+            args.concurrency,
+            args.port,
+        )
+    )
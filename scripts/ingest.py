@@ -1,11 +1,23 @@
 import sys
 import os
+import threading
+import time
+from typing import Any
 import pandas as pd
 import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
 from langchain_core.documents import Document
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.catalog import (
+    build_documents,
+    get_alias_target,
+    list_versions,
+    new_version_name,
+    set_alias_target,
+)
 from app.core.config import settings
 from app.core.logger import get_logger
 from chromadb.utils.embedding_functions.ollama_embedding_function import (
@@ -15,11 +27,180 @@ from chromadb.utils.embedding_functions.ollama_embedding_function import (
 logger = get_logger(__name__)
 
 
+class _LatencyProbe(threading.Thread):
+    """Background thread sampling query latency on the live collection."""
+
+    def __init__(self, collection: Collection, query: str, interval: float):
+        super().__init__(daemon=True)
+        self._collection = collection
+        self._query = query
+        self._interval = interval
+        self._stopped = threading.Event()
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            try:
+                self._collection.query(
+                    query_texts=[self._query], n_results=settings.RETRIEVAL_TOP_K
+                )
+                self.latencies.append(time.perf_counter() - start)
+            except Exception:
+                self.errors += 1
+            self._stopped.wait(self._interval)
+
+    def stop(self) -> None:
+        """Stop sampling and log the latency observed during the reindex."""
+        self._stopped.set()
+        self.join()
+        if not self.latencies:
+            logger.info("Query latency during reindex: no samples, %d errors", self.errors)
+            return
+        latencies = sorted(self.latencies)
+        logger.info(
+            "Query latency during reindex: n=%d p50=%.3fs p95=%.3fs max=%.3fs errors=%d",
+            len(latencies),
+            latencies[int(0.50 * (len(latencies) - 1))],
+            latencies[int(0.95 * (len(latencies) - 1))],
+            latencies[-1],
+            self.errors,
+        )
+
+
+def _add_throttled(collection: Collection, ids: list[str], documents: list[Document]) -> None:
+    """Add documents in batches, capping embedding throughput.
+
+    Batches are ``INGEST_BATCH_SIZE`` documents; when ``INGEST_MAX_DOCS_PER_SECOND``
+    is set, the loop sleeps so Ollama and ChromaDB keep capacity for live queries.
+    """
+    batch_size = max(1, settings.INGEST_BATCH_SIZE)
+    max_rate = settings.INGEST_MAX_DOCS_PER_SECOND
+    start = time.monotonic()
+
+    for offset in range(0, len(documents), batch_size):
+        batch = documents[offset : offset + batch_size]
+        collection.add(
+            ids=ids[offset : offset + batch_size],
+            documents=[doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+        )
+        done = offset + len(batch)
+        logger.info("Embedded %d/%d documents", done, len(documents))
+
+        if max_rate > 0:
+            ahead = done / max_rate - (time.monotonic() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _validate(collection: Collection, ids: list[str], documents: list[Document]) -> None:
+    """Check a freshly ingested collection before it is switched live.
+
+    Raises:
+        RuntimeError: If documents are missing or a known product cannot be found.
+    """
+    count = collection.count()
+    if count != len(ids):
+        raise RuntimeError(f"Expected {len(ids)} documents, collection has {count}")
+
+    if documents:
+        result = collection.query(query_texts=[documents[0].page_content], n_results=1)
+        found = result["ids"][0] if result["ids"] else []
+        if found != [ids[0]]:
+            raise RuntimeError(f"Sample query returned {found}, expected {ids[0]}")
+
+    logger.info("Validated collection '%s' with %d documents", collection.name, count)
+
+
+def _collect_garbage(client: ClientAPI, alias: str, keep: int) -> None:
+    """Delete old collection versions, keeping the newest ``keep`` for rollback.
+
+    A collection from before versioning, named after the alias itself, counts as the
+    oldest version. At least two versions are kept: workers go on reading the
+    previous one for up to ``COLLECTION_ALIAS_TTL_SECONDS`` after a switch.
+    """
+    active = get_alias_target(client, alias)
+    versions = list_versions(client, alias)
+    if alias in {c.name for c in client.list_collections()}:
+        versions.insert(0, alias)
+    for name in versions[: max(0, len(versions) - max(2, keep))]:
+        if name != active:
+            client.delete_collection(name)
+            logger.info("Deleted old collection version '%s'", name)
+
+
+def reindex(
+    client: ClientAPI,
+    alias: str,
+    documents: list[Document],
+    embedding_function: Any,
+) -> str:
+    """Embed documents into a new collection version and switch the alias to it.
+
+    A version that fails to ingest or validate is deleted and the alias is left
+    on the active version.
+
+    Args:
+        client (ClientAPI): ChromaDB client.
+        alias (str): Alias served by the workers, ``COLLECTION_NAME``.
+        documents (list[Document]): Documents to index, each with an id.
+        embedding_function (Any): ChromaDB embedding function of the collections.
+
+    Returns:
+        str: Name of the new active version.
+    """
+    ids = [doc.id for doc in documents if doc.id is not None]
+    if len(ids) != len(documents):
+        raise ValueError("Every document needs an id")
+
+    # Catalogs ingested before versioning live directly in the alias-named collection
+    previous = get_alias_target(client, alias)
+    if previous is None and alias in {c.name for c in client.list_collections()}:
+        previous = alias
+
+    version = new_version_name(alias)
+    collection = client.create_collection(name=version, embedding_function=embedding_function)
+    logger.info("Reindexing into collection '%s' (active: '%s')", version, previous)
+
+    probe = None
+    if previous and settings.INGEST_PROBE_INTERVAL_SECONDS > 0:
+        probe = _LatencyProbe(
+            client.get_collection(previous, embedding_function=embedding_function),
+            query=documents[0].page_content if documents else "product",
+            interval=settings.INGEST_PROBE_INTERVAL_SECONDS,
+        )
+        probe.start()
+
+    try:
+        _add_throttled(collection, ids, documents)
+        _validate(collection, ids, documents)
+    except Exception:
+        logger.error("Reindex into '%s' failed, '%s' stays active", version, previous)
+        client.delete_collection(version)
+        raise
+    finally:
+        if probe:
+            probe.stop()
+
+    set_alias_target(client, alias, version)
+    logger.info("Switched alias '%s' from '%s' to '%s'", alias, previous, version)
+
+    _collect_garbage(client, alias, keep=settings.INGEST_KEEP_VERSIONS)
+    return version
+
+
 def ingest_documents() -> None:
-    """Ingest product data from CSV into ChromaDB vector store.
+    """Ingest product data from CSV into a new version of the ChromaDB catalog.
 
     Loads product data from CSV file, processes it into LangChain documents
     with structured metadata, and stores embeddings in ChromaDB for semantic search.
+    Reviews are aggregated into a precomputed fact sheet instead of being stored raw.
+
+    The documents go into a new versioned collection at a throttled rate while the
+    service keeps reading the active one. Once the new version is validated, the
+    ``COLLECTION_NAME`` alias is switched to it and old versions are deleted.
 
     Raises:
         FileNotFoundError: If the CSV file doesn't exist.
@@ -28,41 +209,16 @@ def ingest_documents() -> None:
     logger.info("Starting document ingestion process")
 
     try:
-        df = pd.read_csv("data/product_description.csv")
+        df = pd.read_csv(settings.PRODUCT_CSV_PATH)
         logger.info("Successfully loaded %d rows from CSV", len(df))
     except FileNotFoundError:
-        logger.error("CSV file 'data/product_description.csv' not found")
+        logger.error("CSV file '%s' not found", settings.PRODUCT_CSV_PATH)
         return
     except Exception as e:
         logger.error("Failed to load CSV file: %s", e)
         return
 
-    documents = []
-    for _, row in df.iterrows():
-        page_content = (
-            f"Product Name: {row.get('title', 'N/A')}\n"
-            f"Description: {row.get('description', 'N/A')}\n"
-            f"Category: {row.get('category', 'N/A')}\n"
-            f"Brand: {row.get('brand', 'N/A')}"
-        )
-
-        metadata = row.to_dict()
-
-        cleaned_metadata = {}
-        for key, value in metadata.items():
-            if pd.isna(value) or value == "":
-                cleaned_metadata[key] = "N/A"
-            elif isinstance(value, (int, float)):
-                cleaned_metadata[key] = value
-            else:
-                str_value = str(value)
-                if len(str_value) > 1000:
-                    str_value = str_value[:1000] + "..."
-                cleaned_metadata[key] = str_value
-
-        doc = Document(page_content=page_content, metadata=cleaned_metadata)
-        documents.append(doc)
-
+    documents = build_documents(df)
     logger.info("Created %d documents for ingestion", len(documents))
 
     try:
@@ -76,21 +232,8 @@ def ingest_documents() -> None:
             host=settings.CHROMA_HOST,
             port=settings.CHROMA_PORT,
         )
-        collection = db_client.get_or_create_collection(
-            name="products",
-            embedding_function=ollama_ef,
-        )
-
-        ids = [f"product_{row['id']}" for _, row in df.iterrows()]
-
-        collection.add(
-            ids=ids,
-            documents=[doc.page_content for doc in documents],
-            metadatas=[doc.metadata for doc in documents],
-        )
-
-        logger.info("Successfully ingested %d documents into 'products' collection", len(documents))
 
+        reindex(db_client, settings.COLLECTION_NAME, documents, ollama_ef)
     except Exception as e:
         logger.error("Failed to ingest documents into ChromaDB: %s", e)
         raise
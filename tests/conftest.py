@@ -2,6 +2,10 @@ import pytest
 import subprocess
 import time
 import httpx
+from types import SimpleNamespace
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
 
 # Register custom marks to avoid warnings
 pytest_plugins = []
@@ -12,13 +16,58 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "integration: mark test as integration test")
 
 
+class FakePipeline:
+    """Fake upstream services, so that the agent graph runs without Ollama or ChromaDB.
+
+    Vector search returns ``docs``. Generations return ``answers`` in order, repeating
+    the last one; an exception in ``answers`` is raised instead. Each generation waits
+    ``delay`` seconds and is counted in ``generations``.
+    """
+
+    def __init__(self):
+        self.docs = [Document(id="product_1", page_content="Essence Mascara", metadata={})]
+        self.answers: list = ["It costs $9.99."]
+        self.delay = 0.0
+        self.generations = 0
+
+    def similarity_search_by_vector_with_relevance_scores(self, _embedding, k=4, filter=None):
+        return [(doc, 0.25) for doc in self.docs]
+
+    def invoke(self, _args):
+        index = min(self.generations, len(self.answers) - 1)
+        self.generations += 1
+        time.sleep(self.delay)
+        answer = self.answers[index]
+        if isinstance(answer, Exception):
+            raise answer
+        return AIMessage(content=answer)
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    """Replace the embeddings, vector store, chat model and summarizer with fakes."""
+    import app.agents as agents
+
+    pipeline = FakePipeline()
+    monkeypatch.setattr(agents, "summarizer_node", RunnableLambda(lambda state: {}))
+    monkeypatch.setattr(agents, "_get_vectorstore", lambda: pipeline)
+    monkeypatch.setattr(agents, "EMB", SimpleNamespace(embed_query=lambda _text: [0.0]))
+    monkeypatch.setattr(
+        "app.agents.ChatPromptTemplate.__or__", lambda prompt, chat: pipeline, raising=False
+    )
+    return pipeline
+
+
 @pytest.fixture(scope="session", autouse=True)
 def override_settings_for_tests():
     from app.core.config import settings
     import app.agents as agents
     import app.graph as graph_mod
+    import app.router as router
     from langchain_ollama import ChatOllama, OllamaEmbeddings
     from langmem.short_term import SummarizationNode
+    from app.history import count_tokens_cached
+    from app.resilience import ResilientEmbeddings
 
     original_values = {
         "OLLAMA_BASE_URL": settings.OLLAMA_BASE_URL,
@@ -31,12 +80,13 @@ def override_settings_for_tests():
 
     settings.OLLAMA_BASE_URL = "http://localhost:11434"
     settings.CHROMA_HOST = "localhost"
+    router._chat_models.clear()
 
     agents.CHAT = ChatOllama(
         model=settings.OLLAMA_MODEL, temperature=0, base_url=settings.OLLAMA_BASE_URL
     )
-    agents.EMB = OllamaEmbeddings(
-        model=settings.EMBEDDING_MODEL_NAME, base_url=settings.OLLAMA_BASE_URL
+    agents.EMB = ResilientEmbeddings(
+        OllamaEmbeddings(model=settings.EMBEDDING_MODEL_NAME, base_url=settings.OLLAMA_BASE_URL)
     )
 
     agents.summarizer_node = SummarizationNode(
@@ -44,6 +94,8 @@ def override_settings_for_tests():
         max_tokens=512,
         max_tokens_before_summary=512,
         max_summary_tokens=256,
+        token_counter=count_tokens_cached,
+        input_messages_key="history_window",
     )
 
     graph_mod.agent_graph = graph_mod._build_agent_graph()
@@ -52,6 +104,7 @@ def override_settings_for_tests():
 
     for k, v in original_values.items():
         setattr(settings, k, v)
+    router._chat_models.clear()
     agents.CHAT = original_chat
     agents.EMB = original_emb
     agents.summarizer_node = original_sum
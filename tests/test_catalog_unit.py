@@ -0,0 +1,51 @@
+from app.catalog import CatalogVocabulary, build_fact_sheet
+
+ROW = {
+    "title": "Essence Mascara Lash Princess",
+    "price": 9.99,
+    "discountPercentage": 10.48,
+    "rating": 2.56,
+    "stock": 99,
+    "availabilityStatus": "In Stock",
+    "warrantyInformation": "1 week warranty",
+    "minimumOrderQuantity": 48,
+    "reviews": (
+        "[{'rating': 3, 'comment': 'Would not recommend!', 'reviewerName': 'Eleanor Collins'}, "
+        "{'rating': 5, 'comment': 'Highly impressed!', 'reviewerName': 'Lucas Gordon'}, "
+        "{'rating': 5, 'comment': 'Highly impressed!', 'reviewerName': 'Eleanor Collins'}]"
+    ),
+}
+
+
+def test_fact_sheet_aggregates_reviews():
+    """Test that raw reviews are reduced to count, mean, histogram and top comments."""
+    facts = build_fact_sheet(ROW, max_comments=1)
+    assert facts["review_count"] == 3
+    assert facts["review_mean"] == 4.33
+    assert facts["review_histogram"] == "1:0 2:0 3:1 4:0 5:2"
+    assert facts["review_comments"] == "Highly impressed!"
+    assert all(isinstance(v, (str, int, float)) for v in facts.values())
+
+
+def test_fact_sheet_summary_is_compact():
+    """Test that the fact sheet carries the key facts without reviewer details."""
+    facts = build_fact_sheet(ROW)
+    sheet = facts["fact_sheet"]
+    assert "Price $9.99 (10.48% off)" in sheet
+    assert "In Stock (99 units)" in sheet
+    assert "3 reviews averaging 4.33/5" in sheet
+    assert "Eleanor" not in sheet
+
+
+def test_fact_sheet_tolerates_missing_values():
+    """Test that malformed reviews and missing numbers are skipped."""
+    facts = build_fact_sheet({"price": float("nan"), "reviews": "not a list"})
+    assert facts["review_count"] == 0
+    assert "price" not in facts
+    assert facts["fact_sheet"] == ""
+
+
+def test_vocabulary_precomputes_title_words():
+    """Test that identifying title words are computed once, without generic words."""
+    vocabulary = CatalogVocabulary(titles=("Annibale Colombo Sofa", "The New Bed"))
+    assert vocabulary.title_words == {"annibale", "colombo", "sofa", "bed"}
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+import app.graph as graph_mod
+import app.main as main
+from app.core.metrics import metrics
+from app.core.models import QueryRequest
+from app.singleflight import SingleFlight
+
+
+def test_single_flight_shares_result_and_errors():
+    """Test that concurrent callers share one run, including its failure."""
+    group = SingleFlight()
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(*(group.do("q", compute) for _ in range(3)))
+        errors = await asyncio.gather(
+            *(group.do("q", fail) for _ in range(2)), return_exceptions=True
+        )
+        again = await group.do("q", compute)
+        return results, errors, again
+
+    results, errors, again = asyncio.run(scenario())
+    assert [r for r, _ in results] == ["answer"] * 3
+    assert [shared for _, shared in results] == [False, True, True]
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert again == ("answer", False)
+    assert len(runs) == 2
+    assert group.in_flight() == 0
+
+
+def test_identical_first_turns_are_coalesced(monkeypatch, fake_pipeline):
+    """Test that identical first-turn questions run the graph once but get their own threads."""
+    fake_pipeline.delay = 0.2
+    graph = graph_mod._build_agent_graph()
+    monkeypatch.setattr(main, "agent_graph", graph)
+    metrics.reset()
+
+    async def burst():
+        questions = ["Essence Mascara price?", "essence  mascara price", "Essence Mascara price?"]
+        requests = [
+            QueryRequest(user_id=f"promo-{i}", query=question)
+            for i, question in enumerate(questions)
+        ]
+        return await asyncio.gather(*(main.handle_query(request) for request in requests))
+
+    responses = asyncio.run(burst())
+
+    assert [r.answer for r in responses] == ["It costs $9.99."] * 3
+    assert fake_pipeline.generations == 1
+    for i, question in enumerate(["Essence Mascara price?", "essence  mascara price"]):
+        values = graph.get_state({"configurable": {"thread_id": f"promo-{i}"}}).values
+        assert [type(m) for m in values["messages"]] == [HumanMessage, AIMessage]
+        assert values["messages"][0].content == question
+        assert values["document_ids"] == ["product_1"]
+
+    assert metrics.counter("coalesce.eligible") == 3
+    assert metrics.counter("coalesce.joined") == 2
+    assert metrics.counter("coalesce.upstream_calls_saved") == 6
+    assert metrics.counter("upstream.generation") == 1
+    assert main.get_metrics()["coalescing_rate"] == pytest.approx(2 / 3)
+
+
+def test_concurrent_turns_of_one_user_are_serialized(monkeypatch, fake_pipeline):
+    """Test that concurrent follow-ups of one conversation each keep their turn."""
+    fake_pipeline.delay = 0.1
+    graph = graph_mod._build_agent_graph()
+    monkeypatch.setattr(main, "agent_graph", graph)
+
+    async def conversation():
+        await main.handle_query(QueryRequest(user_id="u1", query="Essence Mascara price?"))
+        follow_ups = ["and the brand?", "and the stock?"]
+        return await asyncio.gather(
+            *(main.handle_query(QueryRequest(user_id="u1", query=q)) for q in follow_ups)
+        )
+
+    asyncio.run(conversation())
+
+    values = graph.get_state({"configurable": {"thread_id": "u1"}}).values
+    assert len(values["messages"]) == 6
+    assert values["history_counted"] == 5
+    assert main._thread_turns.held() == 0
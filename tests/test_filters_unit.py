@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+from typing import List
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+import app.agents as agents
+from app.catalog import CatalogVocabulary
+from app.filters import extract_filters
+
+VOCAB = CatalogVocabulary(
+    categories=("beauty", "groceries", "kitchen-accessories", "mens-watches", "mobile-accessories"),
+    brands=("Apple", "Essence", "Annibale Colombo", "Rolex"),
+)
+
+
+class FilteringVectorStore:
+    def __init__(self, docs: List[Document], filtered: List[Document]):
+        self._docs = docs
+        self._filtered = filtered
+        self.filters = []
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, _embedding, k: int = 4, filter=None
+    ):
+        self.filters.append(filter)
+        return [(doc, 0.0) for doc in (self._filtered if filter else self._docs)[:k]]
+
+
+def test_extracts_category_and_price_bound():
+    """Test that category names and price bounds become a combined where clause."""
+    where = extract_filters("beauty products under $15", VOCAB)
+    assert where == {"$and": [{"category": "beauty"}, {"price": {"$lte": 15.0}}]}
+
+
+def test_extracts_brand_and_stock():
+    """Test that brand names and stock questions are pushed down as filters."""
+    where = extract_filters("what's in stock from Essence", VOCAB)
+    assert where == {"$and": [{"brand": "Essence"}, {"stock": {"$gt": 0}}]}
+
+
+def test_rating_threshold_is_not_read_as_price():
+    """Test that star ratings are kept apart from price bounds."""
+    where = extract_filters("watches over $100 with at least 4 stars", VOCAB)
+    assert where == {
+        "$and": [
+            {"category": "mens-watches"},
+            {"rating": {"$gte": 4.0}},
+            {"price": {"$gte": 100.0}},
+        ]
+    }
+
+
+def test_price_range_and_ambiguous_words():
+    """Test price ranges, and that lowercase common words do not match brands."""
+    where = extract_filters("an apple between $1 and $3", VOCAB)
+    assert where == {"$and": [{"price": {"$gte": 1.0}}, {"price": {"$lte": 3.0}}]}
+
+
+def test_elliptical_question_has_no_filters():
+    """Test that follow-ups without constraints do not restrict the search."""
+    assert extract_filters("and what is the price?", VOCAB) is None
+    assert extract_filters("is it in stock?", VOCAB) is None
+
+
+def test_retriever_pushes_filters_and_falls_back(monkeypatch):
+    """Test that retriever_agent passes filters down and retries unfiltered on no match."""
+    docs = [Document(page_content="Rolex Submariner", metadata={"brand": "Rolex"})]
+    store = FilteringVectorStore(docs, filtered=[])
+    monkeypatch.setattr(agents, "_get_vectorstore", lambda: store, raising=False)
+    monkeypatch.setattr(agents, "EMB", SimpleNamespace(embed_query=lambda _text: [0.0]))
+    monkeypatch.setattr(agents, "extract_filters", lambda q: extract_filters(q, VOCAB))
+
+    out = agents.retriever_agent({"messages": [HumanMessage(content="Rolex under $10")]})
+
+    assert store.filters == [{"$and": [{"brand": "Rolex"}, {"price": {"$lte": 10.0}}]}, None]
+    assert out["documents"] == docs
+    assert out["filters"] == store.filters[0]
+
+
+def test_numbers_with_units_are_not_prices():
+    """Test that durations, sizes and counts after a comparison word are not price bounds."""
+    for question in (
+        "which products ship in under 3 days?",
+        "items with a warranty of at least 2 years",
+        "anything that can cover 2 people?",
+        "15 star items",
+        "phones with more than 8 gb ram",
+    ):
+        assert extract_filters(question, VOCAB) is None, question
+
+
+def test_bare_numbers_need_a_price_marker():
+    """Test that bare numbers are prices only next to a currency or price word."""
+    assert extract_filters("beauty under 15 dollars", VOCAB) == {
+        "$and": [{"category": "beauty"}, {"price": {"$lte": 15.0}}]
+    }
+    assert extract_filters("groceries costing less than 5", VOCAB) == {
+        "$and": [{"category": "groceries"}, {"price": {"$lte": 5.0}}]
+    }
+    assert extract_filters("something cheaper than 20.", VOCAB) == {"price": {"$lte": 20.0}}
+    assert extract_filters("mascara under $15.", VOCAB) == {"price": {"$lte": 15.0}}
+    assert extract_filters("anything under 3 for the kitchen", VOCAB) is None
@@ -0,0 +1,65 @@
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+import app.agents as agents
+import app.graph as graph_mod
+from app.leases import ThreadLeases
+from app.core.config import settings
+
+
+def test_memory_checkpointer_is_default():
+    """Test that the default backend keeps conversation state in process memory."""
+    assert isinstance(graph_mod._build_checkpointer(), InMemorySaver)
+
+
+def test_sqlite_checkpointer_shares_threads_across_graphs(monkeypatch, tmp_path):
+    """Test that graphs built by different workers see the same conversation threads."""
+    monkeypatch.setattr(settings, "CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite"))
+
+    worker_a = graph_mod._build_agent_graph()
+    worker_b = graph_mod._build_agent_graph()
+    assert isinstance(worker_a.checkpointer, SqliteSaver)
+
+    config = {"configurable": {"thread_id": "shared-user"}}
+    worker_a.update_state(
+        config, {"messages": [HumanMessage(content="Annibale Colombo Sofa")]}, as_node="compactor"
+    )
+
+    messages = worker_b.get_state(config).values["messages"]
+    assert [m.content for m in messages] == ["Annibale Colombo Sofa"]
+
+
+def test_checkpoint_keeps_only_compact_state(fake_pipeline):
+    """Test that a finished turn checkpoints document ids but no transient fields."""
+    graph = graph_mod._build_agent_graph()
+    config = {"configurable": {"thread_id": "compact-user"}}
+    inputs = {"messages": [HumanMessage(content="Essence Mascara price")]}
+    graph.invoke(inputs, config=config, durability="exit")
+
+    values = graph.get_state(config).values
+    assert values["document_ids"] == ["product_1"]
+    assert values["document_scores"] == [0.25]
+    assert all(values.get(key) is None for key in agents.TRANSIENT_KEYS)
+    assert values["messages"][-1].content == "It costs $9.99."
+    assert len(list(graph.get_state_history(config))) == 1
+
+
+def test_thread_lease_excludes_other_workers(tmp_path):
+    """Test that a thread leased by one worker waits for it, or for the lease to expire."""
+    path = str(tmp_path / "checkpoints.sqlite")
+    worker_a = ThreadLeases(path, ttl=60.0)
+    worker_b = ThreadLeases(path, ttl=60.0, poll_seconds=0.01)
+
+    worker_a.acquire("u1", timeout=0.1)
+    with pytest.raises(TimeoutError):
+        worker_b.acquire("u1", timeout=0.05)
+    worker_b.acquire("u2", timeout=0.05)
+
+    worker_a.release("u1")
+    worker_b.acquire("u1", timeout=0.05)
+
+    crashed = ThreadLeases(path, ttl=0.0)
+    assert crashed.try_acquire("u3")
+    worker_a.acquire("u3", timeout=0.05)
@@ -0,0 +1,82 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+from langmem.short_term import RunningSummary, SummarizationNode
+import app.agents as agents
+import app.graph as graph_mod
+import app.history as history
+from app.history import TOKEN_COUNT_KEY, count_tokens_cached, with_token_count
+
+
+def _conversation(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(with_token_count(HumanMessage(content=f"Question {i}?", id=f"h{i}")))
+        messages.append(with_token_count(AIMessage(content=f"Answer {i}.", id=f"a{i}")))
+    return messages
+
+
+def test_account_history_counts_only_new_messages(monkeypatch):
+    """Test that only new messages are tokenized and the window skips summarized ones."""
+    messages = _conversation(200) + [HumanMessage(content="and the price?", id="new")]
+    window_start = 390
+    state = {
+        "messages": messages,
+        "history_start": window_start,
+        "history_counted": 400,
+        "history_tokens": count_tokens_cached(messages[window_start:-1]),
+        "context": {
+            "running_summary": RunningSummary(
+                summary="...", summarized_message_ids=set(), last_summarized_message_id="a196"
+            )
+        },
+    }
+    counted = []
+
+    def counting(batch):
+        counted.extend(batch)
+        return count_tokens_approximately(batch)
+
+    monkeypatch.setattr(history, "count_tokens_approximately", counting)
+    out = agents.account_history(state)
+
+    assert [m.id for m in counted] == ["new"]
+    removed, new = out["messages"][:-1], out["messages"][-1]
+    assert all(isinstance(m, RemoveMessage) for m in removed)
+    assert [m.id for m in removed] == [m.id for m in messages[:394]]
+    assert new.id == "new" and TOKEN_COUNT_KEY in new.response_metadata
+    assert out["history_start"] == 0
+    assert out["history_counted"] == 7
+    assert [m.id for m in out["history_window"]][:2] == ["h197", "a197"]
+    assert out["history_tokens"] == count_tokens_cached(out["history_window"])
+
+
+def test_history_window_follows_summaries_across_turns(monkeypatch, fake_pipeline):
+    """Test that the window and its running total stay in sync with the summary."""
+    fake_pipeline.answers = ["The Essence Mascara costs $9.99 and is in stock."]
+    summarizer = SummarizationNode(
+        model=RunnableLambda(lambda _messages: AIMessage(content="Asked about mascara.")),
+        max_tokens=120,
+        max_summary_tokens=20,
+        token_counter=count_tokens_cached,
+        input_messages_key="history_window",
+    )
+    monkeypatch.setattr(agents, "summarizer_node", summarizer)
+
+    graph = graph_mod._build_agent_graph()
+    config = {"configurable": {"thread_id": "long-user"}}
+    for i in range(12):
+        inputs = {"messages": [HumanMessage(content=f"Essence Mascara question {i}")]}
+        graph.invoke(inputs, config=config, durability="exit")
+
+    values = graph.get_state(config).values
+    messages = values["messages"]
+    running_summary = values["context"]["running_summary"]
+    assert running_summary is not None
+    # Summarized messages leave the checkpoint; the window is all that is kept
+    assert 1 < len(messages) < 24
+    assert messages[-1].content == "The Essence Mascara costs $9.99 and is in stock."
+    assert values["history_start"] == 0
+    # The last answer is counted on the next turn, when it joins the window
+    assert values["history_counted"] == len(messages) - 1
+    assert values["history_tokens"] == count_tokens_cached(messages[:-1])
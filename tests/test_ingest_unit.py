@@ -0,0 +1,130 @@
+import itertools
+import pytest
+from chromadb.errors import NotFoundError
+from langchain_core.documents import Document
+import scripts.ingest as ingest
+from app.catalog import alias_collection_name, get_alias_target, set_alias_target
+
+
+class FakeCollection:
+    def __init__(self, name: str, metadata: dict | None = None):
+        self.name = name
+        self.metadata = metadata
+        self.ids: list[str] = []
+        self.wrong_results = False
+
+    def add(self, ids, documents, metadatas):
+        self.ids.extend(ids)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def query(self, query_texts, n_results):
+        found = self.ids[-1:] if self.wrong_results else self.ids[:1]
+        return {"ids": [found]}
+
+    def modify(self, metadata):
+        self.metadata = metadata
+
+
+class FakeClient:
+    """In-memory stand-in for the ChromaDB client used by the reindex."""
+
+    def __init__(self, names=()):
+        self.collections = {name: FakeCollection(name) for name in names}
+        self.failing_validation = False
+
+    def list_collections(self):
+        return list(self.collections.values())
+
+    def get_collection(self, name, embedding_function=None):
+        if name not in self.collections:
+            raise NotFoundError(f"Collection {name} does not exist")
+        return self.collections[name]
+
+    def get_or_create_collection(self, name, embedding_function=None):
+        return self.collections.setdefault(name, FakeCollection(name))
+
+    def create_collection(self, name, embedding_function=None):
+        collection = FakeCollection(name)
+        collection.wrong_results = self.failing_validation
+        self.collections[name] = collection
+        return collection
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+DOCS = [Document(id=f"product_{i}", page_content=f"Product {i}") for i in range(5)]
+
+
+@pytest.fixture(autouse=True)
+def ingest_settings(monkeypatch):
+    versions = (f"products-v{i:02d}" for i in itertools.count(10))
+    monkeypatch.setattr(ingest, "new_version_name", lambda _alias: next(versions))
+    monkeypatch.setattr(ingest.settings, "INGEST_PROBE_INTERVAL_SECONDS", 0.0)
+    monkeypatch.setattr(ingest.settings, "INGEST_MAX_DOCS_PER_SECOND", 0.0)
+    monkeypatch.setattr(ingest.settings, "INGEST_KEEP_VERSIONS", 2)
+
+
+def test_failed_validation_keeps_alias_and_deletes_new_version():
+    """Test that a version failing validation is dropped and the alias stays put."""
+    client = FakeClient(["products-v01"])
+    set_alias_target(client, "products", "products-v01")
+    client.failing_validation = True
+
+    with pytest.raises(RuntimeError):
+        ingest.reindex(client, "products", DOCS, embedding_function=None)
+
+    assert get_alias_target(client, "products") == "products-v01"
+    assert set(client.collections) == {"products-v01", alias_collection_name("products")}
+
+
+def test_reindex_collects_legacy_collection_after_switch():
+    """Test that the pre-versioning collection is kept for rollback, then collected."""
+    client = FakeClient(["products"])
+
+    first = ingest.reindex(client, "products", DOCS, embedding_function=None)
+    assert get_alias_target(client, "products") == first
+    assert "products" in client.collections
+
+    second = ingest.reindex(client, "products", DOCS, embedding_function=None)
+    assert get_alias_target(client, "products") == second
+    assert "products" not in client.collections
+    assert {first, second} <= set(client.collections)
+
+
+def test_garbage_collection_keeps_active_and_newest_versions():
+    """Test that old versions go, except the active one and at least two newest."""
+    names = ["products", "products-v01", "products-v02", "products-v03", "products-v04"]
+    client = FakeClient(names)
+    set_alias_target(client, "products", "products-v01")
+
+    ingest._collect_garbage(client, "products", keep=1)
+
+    assert sorted(set(client.collections) - {alias_collection_name("products")}) == [
+        "products-v01",
+        "products-v03",
+        "products-v04",
+    ]
+
+
+def test_throttle_sleeps_to_configured_rate(monkeypatch):
+    """Test that batches are spaced so the embedding rate stays at the configured cap."""
+    clock = [0.0]
+    sleeps: list[float] = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(ingest.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(ingest.time, "sleep", sleep)
+    monkeypatch.setattr(ingest.settings, "INGEST_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingest.settings, "INGEST_MAX_DOCS_PER_SECOND", 4.0)
+
+    collection = FakeCollection("products-v01")
+    ingest._add_throttled(collection, [d.id for d in DOCS], DOCS)
+
+    assert collection.ids == [d.id for d in DOCS]
+    assert sleeps == pytest.approx([0.5, 0.5, 0.25])
@@ -85,3 +85,39 @@ def test_responder_sends_context_to_llm(monkeypatch):
     invoke_args = captured["invoke_args"]
     context_str = invoke_args.get("context", "")
     assert "Spec sheet with price $999" in context_str, "Prompt should include the document context"
+
+
+def test_responder_prefers_fact_sheet_over_raw_metadata(monkeypatch):
+    """Test that precomputed fact sheets replace the raw metadata dump in the prompt."""
+    captured = {"invoke_args": None}
+
+    def fake_chain_creation(prompt, chat):
+        class FakeChain:
+            def invoke(self, args):
+                captured["invoke_args"] = args
+                return AIMessage(content="OK")
+
+        return FakeChain()
+
+    monkeypatch.setattr("app.agents.ChatPromptTemplate.__or__", fake_chain_creation, raising=False)
+
+    docs = [
+        Document(
+            page_content="Product Name: AC Chair",
+            metadata={
+                "title": "AC Chair",
+                "fact_sheet": "Price $999.00. 2 reviews averaging 4.5/5",
+                "review_comments": "Comfy!",
+            },
+        )
+    ]
+    state = {
+        "messages": [HumanMessage(content="is the AC Chair well reviewed?")],
+        "summarized_messages": [HumanMessage(content="is the AC Chair well reviewed?")],
+        "documents": docs,
+    }
+
+    _ = agents.responder_agent(state)
+    context_str = captured["invoke_args"].get("context", "")
+    assert "FACTS: Price $999.00. 2 reviews averaging 4.5/5" in context_str
+    assert "META" not in context_str
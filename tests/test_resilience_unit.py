@@ -0,0 +1,155 @@
+import time
+from types import SimpleNamespace
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+import app.agents as agents
+import app.main as main
+import app.resilience as resilience
+from app.catalog import LexicalIndex
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    guarded_call,
+    request_deadline,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience.settings, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(resilience.settings, "BREAKER_FAILURE_THRESHOLD", 2)
+
+
+def test_breaker_opens_then_recovers_through_half_open():
+    """Test that a breaker rejects calls once open and closes after a successful trial."""
+    breaker = CircuitBreaker("svc", failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_guarded_call_retries_idempotent_calls():
+    """Test that a failed attempt is retried and the success keeps the breaker closed."""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise ConnectionError("reset by peer")
+        return "ok"
+
+    assert guarded_call("chroma", flaky, timeout=1.0, retries=2) == "ok"
+    assert len(attempts) == 2
+    assert resilience.breaker_states()["chroma"] == {"state": "closed", "failures": 0}
+
+
+def test_deadline_bounds_slow_calls_and_opens_breaker():
+    """Test that slow calls time out within the request budget and trip the breaker."""
+    start = time.monotonic()
+    for _ in range(2):
+        with request_deadline(0.1), pytest.raises(DeadlineExceeded):
+            guarded_call("ollama_chat", time.sleep, 1.0, timeout=5.0)
+    assert time.monotonic() - start < 0.5
+
+    with pytest.raises(CircuitOpenError):
+        guarded_call("ollama_chat", lambda: "never called", timeout=5.0)
+    assert main.health_check()["status"] == "degraded"
+
+
+def test_exhausted_budget_is_not_an_upstream_failure():
+    """Test that a call left without budget fails without counting against the breaker."""
+    calls = []
+    with request_deadline(0.0), pytest.raises(DeadlineExceeded):
+        guarded_call("chroma", lambda: calls.append(1), timeout=1.0)
+    assert calls == []
+    assert resilience.breaker_states()["chroma"] == {"state": "closed", "failures": 0}
+
+
+def test_stuck_upstream_does_not_starve_others(monkeypatch):
+    """Test that threads held by a stuck upstream leave other upstreams their own workers."""
+    monkeypatch.setattr(resilience.settings, "UPSTREAM_MAX_WORKERS", 1)
+    monkeypatch.setattr(resilience, "_executors", {})
+    with pytest.raises(DeadlineExceeded):
+        guarded_call("chroma", time.sleep, 0.5, timeout=0.05)
+    assert guarded_call("ollama_embeddings", lambda: [0.0], timeout=0.2) == [0.0]
+
+
+def test_hedged_call_returns_the_faster_duplicate():
+    """Test that a straggling call is hedged by a duplicate whose result wins."""
+    calls = []
+
+    def embed():
+        calls.append(1)
+        time.sleep(0.5 if len(calls) == 1 else 0.0)
+        return [0.0]
+
+    start = time.monotonic()
+    assert guarded_call("ollama_embeddings", embed, timeout=2.0, hedge_after=0.05) == [0.0]
+    assert time.monotonic() - start < 0.3
+    assert len(calls) == 2
+
+
+def test_retriever_falls_back_to_lexical_search(monkeypatch):
+    """Test that retrieval degrades to keyword search when embeddings are unavailable."""
+    sofa = Document(id="product_1", page_content="Annibale Colombo Sofa", metadata={})
+    bed = Document(id="product_2", page_content="Annibale Colombo Bed", metadata={})
+
+    def unavailable(_text):
+        raise CircuitOpenError("Circuit 'ollama_embeddings' is open")
+
+    monkeypatch.setattr(agents, "EMB", SimpleNamespace(embed_query=unavailable))
+    monkeypatch.setattr(agents, "_get_vectorstore", lambda: None)
+    monkeypatch.setattr(agents, "get_lexical_index", lambda: LexicalIndex([sofa, bed]))
+
+    out = agents.retriever_agent({"messages": [HumanMessage(content="Colombo sofa price")]})
+    assert out["documents"][0] == sofa
+    assert out["document_ids"] == ["product_1", "product_2"]
+
+
+def test_responder_serves_cached_answer_when_generation_fails(fake_pipeline):
+    """Test that a failing chat model is answered from the last answer to the question."""
+    docs = [Document(id="product_1", page_content="Essence Mascara", metadata={})]
+    fake_pipeline.answers = ["It costs $9.99.", TimeoutError("stuck")]
+    state = {"messages": [HumanMessage(content="Essence Mascara price?")], "documents": docs}
+
+    assert agents.responder_agent(dict(state))["generation"] == "It costs $9.99."
+    assert agents.responder_agent(dict(state))["generation"] == "It costs $9.99."
+    assert resilience.breaker_states()["ollama_chat"]["failures"] == 1
+
+
+def test_follow_up_answers_are_not_shared(fake_pipeline):
+    """Test that answers given within a conversation are never served from the cache."""
+    docs = [Document(id="product_7", page_content="Essence Mascara", metadata={})]
+    fake_pipeline.answers = ["Yes, it ships today.", TimeoutError("stuck")]
+    history = [HumanMessage(content="Essence Mascara"), AIMessage(content="It costs $9.99.")]
+    state = {"messages": [*history, HumanMessage(content="Does it ship today?")], "documents": docs}
+
+    assert agents.responder_agent(dict(state))["generation"] == "Yes, it ships today."
+    assert agents.responder_agent(dict(state))["generation"] != "Yes, it ships today."
+
+
+def test_summarizer_failure_keeps_history_window(monkeypatch):
+    """Test that a failing summarization keeps the recent messages instead of failing."""
+
+    def unavailable(_state):
+        raise CircuitOpenError("Circuit 'ollama_chat' is open")
+
+    monkeypatch.setattr(agents, "summarizer_node", SimpleNamespace(invoke=unavailable))
+    window = [HumanMessage(content="Essence Mascara price?")]
+
+    out = agents.summarize_history({"messages": window, "history_window": window})
+    assert out == {"summarized_messages": window}
@@ -1,7 +1,9 @@
 from typing import List
+import pytest
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, AIMessage
 import app.agents as agents
+from app.catalog import CatalogVocabulary, DocumentCache
 
 
 class FakeRetriever:
@@ -22,6 +24,24 @@ class FakeVectorStore:
     def similarity_search(self, _query: str, k: int = 4) -> List[Document]:
         return self._docs[:k]
 
+    def similarity_search_by_vector_with_relevance_scores(
+        self, _embedding, k: int = 4, filter=None
+    ):
+        return [(doc, 0.1 * i) for i, doc in enumerate(self._docs[:k])]
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        return [doc for doc in self._docs if doc.id in ids]
+
+
+class FakeEmbeddings:
+    def embed_query(self, _text: str) -> List[float]:
+        return [0.0]
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    monkeypatch.setattr(agents, "EMB", FakeEmbeddings())
+
 
 def test_retriever_sets_documents_and_enhanced_query(monkeypatch):
     """Test that retriever_agent builds enhanced_query and sets documents in state."""
@@ -73,3 +93,112 @@ def test_retriever_uses_latest_human_message(monkeypatch):
     assert (
         "and what is the price?" in eq.lower()
     ), "enhanced_query must include the latest human question"
+
+
+def test_elliptical_follow_up_reuses_previous_documents(monkeypatch):
+    """Test that a follow-up about the same product skips the vector search."""
+    previous = [
+        Document(id="p1", page_content="Rolex Datejust", metadata={"title": "Rolex Datejust"}),
+        Document(
+            id="p2",
+            page_content="Annibale Colombo Sofa",
+            metadata={"title": "Annibale Colombo Sofa"},
+        ),
+    ]
+
+    class CatalogOnlyStore(FakeVectorStore):
+        def similarity_search_by_vector_with_relevance_scores(self, _embedding, k=4, filter=None):
+            raise AssertionError("vector search must be skipped")
+
+    monkeypatch.setattr(agents, "_get_vectorstore", lambda: CatalogOnlyStore(previous))
+    monkeypatch.setattr(agents, "_document_cache", DocumentCache())
+
+    state = {
+        "messages": [
+            HumanMessage(content="Annibale Colombo Sofa"),
+            AIMessage(content="The Annibale Colombo Sofa is a luxurious sofa."),
+            HumanMessage(content="and the warranty?"),
+        ],
+        "document_ids": ["p1", "p2"],
+        "document_scores": [0.3, 0.4],
+    }
+    out = agents.retriever_agent(state)
+    assert [d.metadata["title"] for d in out["documents"]] == [
+        "Annibale Colombo Sofa",
+        "Rolex Datejust",
+    ]
+    assert out["document_ids"] == ["p2", "p1"]
+    assert out["document_scores"] == [0.4, 0.3]
+
+
+def test_follow_up_with_new_product_searches_again(monkeypatch):
+    """Test that an elliptical question naming another product falls back to retrieval."""
+    sofa = "Annibale Colombo Sofa"
+    bed = "Annibale Colombo Bed"
+    previous = [Document(id="sofa", page_content=sofa, metadata={"title": sofa})]
+    docs = [Document(id="bed", page_content=bed, metadata={"title": bed})]
+
+    def fake_get_vecstore():
+        return FakeVectorStore(docs)
+
+    monkeypatch.setattr(agents, "_get_vectorstore", fake_get_vecstore, raising=False)
+    monkeypatch.setattr(agents, "_document_cache", DocumentCache())
+    agents._document_cache.put(previous)
+    monkeypatch.setattr(agents, "get_vocabulary", lambda: CatalogVocabulary(titles=(bed,)))
+
+    state = {
+        "messages": [
+            HumanMessage(content="Annibale Colombo Sofa"),
+            AIMessage(content="The sofa costs $2499."),
+            HumanMessage(content="and the bed?"),
+        ],
+        "document_ids": ["sofa"],
+    }
+    out = agents.retriever_agent(state)
+    assert out["documents"] == docs
+    assert out["document_ids"] == ["bed"]
+
+
+def test_superlative_follow_up_searches_again(monkeypatch):
+    """Test that a superlative question asks about the whole catalog, not the last products."""
+    sofa = "Annibale Colombo Sofa"
+    laptop = "Apple MacBook Pro"
+    previous = [Document(id="sofa", page_content=sofa, metadata={"title": sofa})]
+    docs = [Document(id="laptop", page_content=laptop, metadata={"title": laptop})]
+
+    monkeypatch.setattr(agents, "_get_vectorstore", lambda: FakeVectorStore(docs))
+    monkeypatch.setattr(agents, "_document_cache", DocumentCache())
+    agents._document_cache.put(previous)
+    monkeypatch.setattr(agents, "get_vocabulary", lambda: CatalogVocabulary())
+
+    state = {
+        "messages": [
+            HumanMessage(content="Annibale Colombo Sofa"),
+            AIMessage(content="The sofa costs $2499."),
+            HumanMessage(content="what is the cheapest laptop?"),
+        ],
+        "document_ids": ["sofa"],
+    }
+    out = agents.retriever_agent(state)
+    assert out["document_ids"] == ["laptop"]
+
+
+def test_active_collection_follows_alias_switch(monkeypatch):
+    """Test that a reindex alias switch is picked up after the TTL and clears cached docs."""
+    target = {"name": "products-v1"}
+    monkeypatch.setattr(agents, "_get_client", lambda: None)
+    monkeypatch.setattr(agents, "get_alias_target", lambda _client, _alias: target["name"])
+    monkeypatch.setattr(agents.settings, "COLLECTION_ALIAS_TTL_SECONDS", 60.0)
+    monkeypatch.setattr(agents, "_active_collection", {"name": None, "checked_at": 0.0})
+    cache = DocumentCache()
+    monkeypatch.setattr(agents, "_document_cache", cache)
+
+    assert agents._resolve_active_collection() == "products-v1"
+    cache.put([Document(id="product_1", page_content="Sofa")])
+
+    target["name"] = "products-v2"
+    assert agents._resolve_active_collection() == "products-v1"
+
+    agents._active_collection["checked_at"] -= 60.0
+    assert agents._resolve_active_collection() == "products-v2"
+    assert cache.get_many(["product_1"], lambda ids: []) == []
@@ -0,0 +1,88 @@
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain.prompts import ChatPromptTemplate
+import app.agents as agents
+import app.router as router
+from app.core.config import ModelTier, settings
+from app.core.metrics import metrics
+
+TIERS = [
+    ModelTier(name="small", model="small-model", max_complexity=0, num_predict=128),
+    ModelTier(name="large", model="large-model", max_complexity=99),
+]
+
+
+def _fake_chain_creation(answers):
+    def creation(prompt, chat):
+        class FakeChain:
+            def invoke(self, args):
+                return AIMessage(content=answers[chat.model])
+
+        return FakeChain()
+
+    return creation
+
+
+def test_complexity_routes_simple_and_comparison_questions(monkeypatch):
+    """Test that simple questions go to the small tier and comparisons to the large one."""
+    monkeypatch.setattr(settings, "MODEL_TIERS", TIERS)
+    docs = [
+        Document(page_content="Rolex Datejust", metadata={"title": "Rolex Datejust"}),
+        Document(page_content="Rolex Submariner", metadata={"title": "Rolex Submariner"}),
+    ]
+
+    simple = router.estimate_complexity("is this in stock?", docs)
+    comparison = router.estimate_complexity("which one is better, Datejust or Submariner?", docs)
+
+    assert router.select_tier(simple) == 0
+    assert router.select_tier(comparison) == 1
+
+
+def test_long_prompts_skip_tiers_without_room(monkeypatch):
+    """Test that a simple question with a long history goes to a tier whose context holds it."""
+    tiers = [
+        ModelTier(name="small", model="s", max_complexity=0, num_predict=256, num_ctx=2048),
+        ModelTier(name="medium", model="m", max_complexity=0, num_ctx=4096),
+        ModelTier(name="large", model="l", max_complexity=99, num_ctx=8192),
+    ]
+    monkeypatch.setattr(settings, "MODEL_TIERS", tiers)
+
+    assert router.select_tier(0, prompt_tokens=1792) == 0
+    assert router.select_tier(0, prompt_tokens=1793) == 1
+    assert router.select_tier(1, prompt_tokens=3000) == 2
+    assert router.select_tier(0, prompt_tokens=20000) == 2
+
+
+def test_summarizer_input_fits_summarization_tier():
+    """Test that the summarizer takes no more history than its tier's context holds."""
+    assert agents._summary_input_tokens(2048) == 1280
+    assert agents._summary_input_tokens(None) == 4096
+    assert agents._summary_input_tokens(512) == agents._SUMMARY_TOKENS
+
+
+def test_default_tier_uses_ollama_model(monkeypatch):
+    """Test that without MODEL_TIERS everything is served by OLLAMA_MODEL."""
+    monkeypatch.setattr(settings, "MODEL_TIERS", [])
+    tiers = router.get_tiers()
+    assert [t.model for t in tiers] == [settings.OLLAMA_MODEL]
+    assert router.select_tier(5) == 0
+
+
+def test_generate_escalates_when_small_model_cannot_answer(monkeypatch):
+    """Test that an 'I cannot find' answer is retried on the next tier and recorded."""
+    monkeypatch.setattr(settings, "MODEL_TIERS", TIERS)
+    monkeypatch.setattr(router, "_chat_models", {})
+    answers = {"small-model": "I cannot find that information.", "large-model": "It costs $10."}
+    monkeypatch.setattr(
+        "app.router.ChatPromptTemplate.__or__", _fake_chain_creation(answers), raising=False
+    )
+    metrics.reset()
+
+    prompt = ChatPromptTemplate.from_messages([("human", "{question}")])
+    answer = router.generate(prompt, {"question": "price?"}, tier_index=0)
+
+    assert answer == "It costs $10."
+    assert router.get_chat(TIERS[0]).num_predict == 128
+    assert metrics.counter("router.routed.small") == 1
+    assert metrics.counter("router.escalated.small") == 1
+    assert set(metrics.snapshot()["timings"]) == {"router.latency.small", "router.latency.large"}